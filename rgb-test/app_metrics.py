@@ -0,0 +1,286 @@
+# --- 실행 중 앱 계측 ---
+# 단계별 소요 시간(span), 단계별 rerun 횟수, 캐시 적중률을 프로세스 전역으로 모읍니다.
+# 기록은 잠금 한 번 + 덧셈 몇 번이라 운영 환경에서도 켜 둘 수 있습니다.
+#
+# 노출 방법 (환경 변수, 프로세스당 한 번 설정)
+#   RGB_METRICS_PORT=9108          로컬 HTTP 엔드포인트
+#                                  GET /metrics                 Prometheus 텍스트
+#                                  GET /profile                 샘플링 프로파일 (collapsed stack 형식)
+#                                  GET /profile?action=start|stop|reset
+#   RGB_METRICS_LOG_INTERVAL=60    N초마다 JSON 로그 한 줄 (stderr, 'metrics {...}')
+#   RGB_PROFILE=1                  시작 시 샘플링 프로파일러 켜기
+#   RGB_LOG_LEVEL=INFO             앱 모듈 로그 수준 (기본 INFO, WARNING 이면 주기 로그/시작 리포트가 꺼집니다)
+#
+# 기록하는 span: data_load, grouping, scoring, chart, image_render, png_encode/webp_encode (encode_image, 두 렌더링 경로 공통),
+#               strip_draw, strip_encode (띠 렌더링)
+#
+# Streamlit 은 루트 로거를 설정하지 않으므로 setup_from_env 가 앱 모듈 로거(APP_LOGGERS)에 stderr 핸들러를 붙입니다.
+# 예:  RGB_METRICS_LOG_INTERVAL=60 streamlit run streamlit_app.py   → 실행한 터미널(stderr)에 1분마다 요약 한 줄
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# 히스토그램 버킷 상한 (초)
+SPAN_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+DEFAULT_SAMPLE_INTERVAL = 0.01
+MAX_STACK_DEPTH = 40
+APP_LOGGERS = ('app_metrics', 'startup_report', 'session_store', 'font_registry', 'sprite_atlas', 'scoring_service')
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+
+class Metrics:
+    """span 히스토그램과 라벨 붙은 카운터. 스레드 안전합니다."""
+
+    def __init__(self):
+        self._spans = {}  # 이름 → [버킷별 횟수..., +Inf 횟수, 합계, 최대]
+        self._counters = Counter()  # (이름, ((라벨, 값), ...)) → 값
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            entry = self._spans.get(name)
+            if entry is None:
+                entry = self._spans[name] = [0] * (len(SPAN_BUCKETS) + 1) + [0.0, 0.0]
+            entry[bisect_left(SPAN_BUCKETS, seconds)] += 1
+            entry[-2] += seconds
+            if seconds > entry[-1]: entry[-1] = seconds
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock: self._counters[key] += amount
+
+    def snapshot(self):
+        """{'spans': {이름: {count, sum, max}}, 'counters': {이름{라벨}: 값}} 요약."""
+        with self._lock:
+            spans = {name: {'count': sum(entry[:-2]), 'sum': round(entry[-2], 6), 'max': round(entry[-1], 6)}
+                     for name, entry in self._spans.items()}
+            counters = {_series(name, labels): value for (name, labels), value in self._counters.items()}
+        return {'spans': spans, 'counters': counters, 'cache_hit_rates': cache_hit_rates(self)}
+
+    def render_prometheus(self, prefix='rgb_'):
+        with self._lock:
+            spans = {name: list(entry) for name, entry in self._spans.items()}
+            counters = dict(self._counters)
+        lines = [f"# TYPE {prefix}stage_seconds histogram"]
+        for name, entry in sorted(spans.items()):
+            cumulative = 0
+            for bound, count in zip(SPAN_BUCKETS + ('+Inf',), entry[:-2]):
+                cumulative += count
+                lines.append(f'{prefix}stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}stage_seconds_sum{{stage="{name}"}} {entry[-2]:.6f}')
+            lines.append(f'{prefix}stage_seconds_count{{stage="{name}"}} {cumulative}')
+        lines.append(f"# TYPE {prefix}stage_seconds_max gauge")
+        lines += [f'{prefix}stage_seconds_max{{stage="{name}"}} {entry[-1]:.6f}' for name, entry in sorted(spans.items())]
+        by_name = {}
+        for (name, labels), value in counters.items():
+            by_name.setdefault(name, []).append((labels, value))
+        for name, series in sorted(by_name.items()):
+            lines.append(f"# TYPE {prefix}{name} counter")
+            lines += [f"{prefix}{_series(name, labels)} {value}" for labels, value in sorted(series)]
+        # 결과 이미지 캐시는 image_cache 가 이미 로드된 경우에만 보고합니다 (지연 import 유지).
+        image_cache = sys.modules.get('image_cache')
+        if image_cache is not None:
+            cache = image_cache.default_image_cache
+            lines.append(f"# TYPE {prefix}image_cache_requests_total counter")
+            lines.append(f'{prefix}image_cache_requests_total{{result="hit"}} {cache.hits}')
+            lines.append(f'{prefix}image_cache_requests_total{{result="miss"}} {cache.misses}')
+        return "\n".join(lines) + "\n"
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+metrics = Metrics()
+
+
+# --- 캐시 적중률 ---
+def instrument_cache(name, cache_decorator):
+    """캐시 데코레이터(st.cache_resource 등)를 감싸 호출 수와 실제 실행(미스) 수를 셉니다."""
+    def decorate(func):
+        @functools.wraps(func)
+        def on_miss(*args, **kwargs):
+            metrics.inc('cache_misses_total', cache=name)
+            return func(*args, **kwargs)
+        cached = cache_decorator(on_miss)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            metrics.inc('cache_calls_total', cache=name)
+            return cached(*args, **kwargs)
+        call.clear = getattr(cached, 'clear', None)
+        return call
+    return decorate
+
+
+def cache_hit_rates(source=metrics):
+    """{캐시 이름: 적중률} (호출이 없던 캐시는 제외)."""
+    with source._lock:
+        calls = {dict(labels)['cache']: value for (name, labels), value in source._counters.items() if name == 'cache_calls_total'}
+        misses = {dict(labels)['cache']: value for (name, labels), value in source._counters.items() if name == 'cache_misses_total'}
+    return {cache: round(1 - misses.get(cache, 0) / count, 4) for cache, count in calls.items() if count}
+
+
+# --- 샘플링 프로파일러 ---
+class SamplingProfiler:
+    """interval 초마다 모든 스레드의 스택을 샘플링해 collapsed stack 별 횟수를 셉니다. 켜고 끄기를 실행 중에 할 수 있습니다."""
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        # 샘플러 스레드가 쓰는 동안 HTTP 스레드가 읽으므로 samples 는 잠금 안에서만 다룹니다.
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = threading.Event()
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    def start(self):
+        if self.running:
+            return
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+
+    def reset(self):
+        with self._lock:
+            self.samples = Counter()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while self._running.is_set():
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                with self._lock:
+                    self.samples[key] += 1
+            time.sleep(self.interval)
+
+    def collapsed(self, top=200):
+        """flamegraph.pl / speedscope 가 읽는 'a;b;c 횟수' 형식 텍스트."""
+        with self._lock:
+            top_stacks = self.samples.most_common(top)
+        return "\n".join(f"{stack} {count}" for stack, count in top_stacks) + "\n"
+
+    def sample_count(self):
+        with self._lock:
+            return sum(self.samples.values())
+
+
+profiler = SamplingProfiler()
+
+
+# --- 노출 ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/metrics':
+            self._reply(200, 'text/plain; version=0.0.4', metrics.render_prometheus())
+        elif url.path == '/profile':
+            action = parse_qs(url.query).get('action', [None])[0]
+            if action in ('start', 'stop', 'reset'):
+                getattr(profiler, action)()
+                self._reply(200, 'application/json', json.dumps({'running': profiler.running, 'samples': profiler.sample_count()}))
+            else:
+                self._reply(200, 'text/plain; charset=utf-8', profiler.collapsed())
+        else:
+            self._reply(404, 'text/plain', "not found\n")
+
+    def _reply(self, status, content_type, text):
+        data = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_setup_done = False
+_setup_lock = threading.Lock()
+
+
+def start_metrics_server(port, host='127.0.0.1'):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logger.info("metrics on http://%s:%d/metrics", host, server.server_address[1])
+    return server
+
+
+def start_periodic_log(interval):
+    def run():
+        while True:
+            time.sleep(interval)
+            logger.info("metrics %s", json.dumps(metrics.snapshot(), ensure_ascii=False))
+    threading.Thread(target=run, name='metrics-log', daemon=True).start()
+
+
+def configure_app_logging(level=None):
+    """앱 모듈 로거의 수준을 정하고, 루트 로거에 핸들러가 없으면(Streamlit) stderr 핸들러를 직접 붙입니다.
+    루트 로거가 이미 설정된 프로세스(scoring_service 의 basicConfig 등)에서는 수준만 맞춥니다."""
+    level = level or os.environ.get('RGB_LOG_LEVEL', 'INFO').upper()
+    handler = None
+    if not logging.getLogger().handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    for name in APP_LOGGERS:
+        app_logger = logging.getLogger(name)
+        app_logger.setLevel(level)
+        if handler is not None and not app_logger.handlers:
+            app_logger.addHandler(handler)
+            app_logger.propagate = False
+
+
+def setup_from_env():
+    """환경 변수에 따라 엔드포인트/주기 로그/프로파일러를 프로세스당 한 번만 켭니다 (Streamlit rerun 마다 호출해도 안전)."""
+    global _setup_done
+    if _setup_done:
+        return
+    with _setup_lock:
+        if _setup_done:
+            return
+        _setup_done = True
+        configure_app_logging()
+        port = os.environ.get('RGB_METRICS_PORT')
+        if port:
+            try:
+                start_metrics_server(int(port))
+            except OSError:
+                logger.exception("metrics 엔드포인트를 열 수 없습니다 (포트 %s).", port)
+        interval = os.environ.get('RGB_METRICS_LOG_INTERVAL')
+        if interval: start_periodic_log(float(interval))
+        if os.environ.get('RGB_PROFILE') == '1': profiler.start()
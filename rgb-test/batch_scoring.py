@@ -0,0 +1,105 @@
+# --- NumPy 기반 일괄 채점 ---
+# 보관된 세션 N개 × 문항 Q개 응답 행렬을 몇 번의 행렬 연산으로 채점합니다.
+# 공식은 scoring.py 와 동일하며, 결과도 세션 단위 채점과 일치해야 합니다.
+import numpy as np
+
+from scoring import (
+    COMPREHENSIVE_BAND_TABLE, COMPREHENSIVE_DESCRIPTION_ID_TABLE, COMPREHENSIVE_PERCENTAGE_TABLE, TYPE_CODES,
+    WORLD_BAND_TABLE, WORLD_DESCRIPTION_ID_TABLE, WORLD_SCORE_MAX, WORLD_SCORE_MIN, WORLDS,
+)
+
+# --- 부호 행렬 (18 유형 → 세계별 R/G/B 점수) ---
+# 열 순서: i_R, i_G, i_B, a_R, a_G, a_B, s_R, s_G, s_B
+WORLD_SIGNS = np.zeros((len(TYPE_CODES), len(WORLDS) * 3), dtype=np.float32)
+for _t, _code in enumerate(TYPE_CODES):
+    _col = WORLDS.index(_code[2]) * 3 + "RGB".index(_code[0])
+    WORLD_SIGNS[_t, _col] = 1 if _code[1] == 'P' else -1
+
+# --- 종합 값(0~255) → 퍼센티지/구간/설명 ID/HEX 조회표, 세계 점수 → 구간/설명 ID 조회표 ---
+# scoring.py 의 조회표를 그대로 배열로 옮겨 세션 단위 채점과 값이 정확히 같도록 합니다.
+PERCENTAGE_LUT = np.array(COMPREHENSIVE_PERCENTAGE_TABLE, dtype=np.float64)
+COMPREHENSIVE_INDEX_LUT = np.array(COMPREHENSIVE_BAND_TABLE, dtype=np.int8)
+COMPREHENSIVE_DESCRIPTION_ID_LUT = np.array([COMPREHENSIVE_DESCRIPTION_ID_TABLE[k] for k in "RGB"], dtype=np.int16)  # 3 × 256
+HEX_LUT = np.array(['{:02X}'.format(v) for v in range(256)])
+WORLD_BAND_LUT = np.array([WORLD_BAND_TABLE[w] for w in WORLDS], dtype=np.int8)  # 3 × (MAX - MIN + 1)
+WORLD_DESCRIPTION_ID_LUT = np.array([[WORLD_DESCRIPTION_ID_TABLE[w][k] for k in "RGB"] for w in WORLDS], dtype=np.int16)  # 3 × 3 × 점수
+
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def build_weight_matrix(question_ids, question_map):
+    """문항 순서(question_ids)에 맞춘 Q × 18 유형 가중치(one-hot) 행렬을 만듭니다."""
+    weights = np.zeros((len(question_ids), len(TYPE_CODES)), dtype=np.float32)
+    for row, q_id in enumerate(question_ids):
+        q_type = question_map[q_id]['type']
+        if q_type in TYPE_CODES: weights[row, TYPE_CODES.index(q_type)] = 1
+    return weights
+
+
+def responses_to_matrix(sessions, question_ids):
+    """세션별 응답 dict 목록을 N × Q int8 행렬로 변환합니다. 미응답은 0으로 채웁니다."""
+    column = {q_id: i for i, q_id in enumerate(question_ids)}
+    matrix = np.zeros((len(sessions), len(question_ids)), dtype=np.int8)
+    for row, responses in enumerate(sessions):
+        for q_id, value in responses.items():
+            matrix[row, column[q_id]] = value
+    return matrix
+
+
+def _world_slots(world_scores):
+    # 조회표 범위 밖의 점수는 양 끝 구간과 같으므로 잘라서 찾습니다.
+    world_scores = np.asarray(world_scores).reshape(-1, len(WORLDS), 3)
+    return np.clip(world_scores, WORLD_SCORE_MIN, WORLD_SCORE_MAX).astype(np.intp) - WORLD_SCORE_MIN
+
+
+def world_indices_from_scores(world_scores):
+    """N × 9 세계별 (정수) 점수를 scoring.WORLD_BAND_TABLE 로 구간 인덱스로 변환합니다."""
+    return WORLD_BAND_LUT[np.arange(len(WORLDS))[None, :, None], _world_slots(world_scores)]
+
+
+def world_description_ids_from_scores(world_scores):
+    """N × 9 세계별 (정수) 점수 → N × 3(i/a/s) × 3(R/G/B) 설명 ID."""
+    return WORLD_DESCRIPTION_ID_LUT[np.arange(len(WORLDS))[None, :, None], np.arange(3)[None, None, :], _world_slots(world_scores)]
+
+
+def score_batch(responses, weights, chunk_size=DEFAULT_CHUNK_SIZE):
+    """N × Q 응답 행렬을 일괄 채점합니다.
+
+    반환값 dict:
+      'type_scores'  N × 18 (TYPE_CODES 순서)
+      'totals'       N × 3 (R/G/B 종합 점수)
+      'rgb'          N × 3 (0~255로 자른 종합 값)
+      'percentages'  N × 3
+      'hex'          N 개 '#RRGGBB' 문자열
+      'comprehensive_indices'  N × 3
+      'world_indices'          N × 3(i/a/s) × 3(R/G/B)
+      'comprehensive_description_ids'  N × 3, 'world_description_ids'  N × 3 × 3 (scoring.description_id)
+    """
+    responses = np.asarray(responses)
+    n = responses.shape[0]
+    type_scores = np.empty((n, len(TYPE_CODES)), dtype=np.int32)
+    world_scores = np.empty((n, len(WORLDS) * 3), dtype=np.int32)
+
+    # float32 행렬곱(BLAS) 사용: 점수 범위가 작아 정수 값이 정확히 보존됩니다.
+    # 청크 단위로 나누어 float 변환 버퍼 크기를 제한합니다.
+    for start in range(0, n, chunk_size):
+        chunk = responses[start:start + chunk_size].astype(np.float32)
+        chunk_types = chunk @ weights
+        type_scores[start:start + chunk_size] = chunk_types
+        world_scores[start:start + chunk_size] = chunk_types @ WORLD_SIGNS
+
+    totals = world_scores.reshape(n, len(WORLDS), 3).sum(axis=1)
+    rgb = np.clip(128 + totals, 0, 255)
+    hex_codes = np.char.add(np.char.add(np.char.add('#', HEX_LUT[rgb[:, 0]]), HEX_LUT[rgb[:, 1]]), HEX_LUT[rgb[:, 2]])
+
+    return {
+        'type_scores': type_scores,
+        'totals': totals,
+        'rgb': rgb.astype(np.uint8),
+        'percentages': PERCENTAGE_LUT[rgb],
+        'hex': hex_codes,
+        'comprehensive_indices': COMPREHENSIVE_INDEX_LUT[rgb],
+        'world_indices': world_indices_from_scores(world_scores),
+        'comprehensive_description_ids': COMPREHENSIVE_DESCRIPTION_ID_LUT[np.arange(3)[None, :], rgb],
+        'world_description_ids': world_description_ids_from_scores(world_scores),
+    }
@@ -0,0 +1,362 @@
+# --- 핫 패스 벤치마크 ---
+# 합성 응답 세트로 문항 그룹핑, 채점, 레이아웃, 줄바꿈, PNG 인코딩, 차트 그리기 등을 UI 없이 측정합니다.
+# 케이스별 지연 백분위수(ms), 1회 실행 시 파이썬 힙 할당(tracemalloc) (인코딩 케이스는 출력 바이트)를 보고하고,
+# JSON 기준선과 비교해 중앙값이 임계값 이상 느려지면 종료 코드 1 로 실패합니다.
+# tracemalloc 은 PIL/NumPy 의 C 버퍼(이미지 캔버스 등)를 보지 못하므로 메모리 비교에는 --rss 를 씁니다.
+# --rss 는 케이스마다 별도 프로세스에서 준비를 마친 뒤 1회 실행의 최대 RSS 증가분을 잽니다.
+#
+#   python benchmarks.py --save baseline.json             # 기준선 저장
+#   python benchmarks.py --baseline baseline.json          # 비교 (기본 임계값 25%)
+#   python benchmarks.py --cases layout wrap --iterations 200
+#   python benchmarks.py --check-colors --cases render     # 모든 인코더 프로필의 결과 색 일치 확인
+#   python benchmarks.py --rss --cases render render_strips # 케이스별 RSS 증가분 (케이스마다 하위 프로세스)
+import argparse
+import functools
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FONT_PATH = os.path.join(current_dir, 'NanumGothic.ttf')
+DEFAULT_THRESHOLD = 0.25
+# 이보다 작은 차이는 타이머/스케줄링 잡음으로 보고 무시합니다.
+MIN_REGRESSION_MS = 0.05
+SYNTHETIC_SESSIONS = 64
+
+
+# --- 합성 데이터 ---
+class BenchmarkData:
+    """벤치마크 케이스가 공유하는 문항 은행, 합성 응답, 채점 결과."""
+
+    def __init__(self, font_path=DEFAULT_FONT_PATH, seed=0):
+        from question_bank import balanced_question_rows, open_bank
+        from scoring import score_responses
+        self.font_path = font_path
+        self.bank = open_bank()
+        self.question_rows = balanced_question_rows(self.bank)
+        self.question_map = {q['id']: q for q in self.bank.to_questions_data()['questions']}
+        self.description_blocks = self.bank.to_description_blocks()
+        self.description_table = self.bank.description_table()
+        rng = random.Random(seed)
+        self.sessions = [{self.bank.question_ids[row]: rng.randint(-4, 4) for rows in self.question_rows.values() for row in rows}
+                         for _ in range(SYNTHETIC_SESSIONS)]
+        self.results = [score_responses(s, self.question_map, self.description_table) for s in self.sessions]
+
+
+def _cycle(items):
+    while True:
+        yield from items
+
+
+# --- 케이스: data 를 받아 인자 없는 실행 함수를 반환 ---
+def case_grouping(data):
+    from question_bank import balanced_question_rows
+    from quiz_state import init_quiz_state
+    rng = random.Random(1)
+    return lambda: init_quiz_state({}, balanced_question_rows(data.bank), rng)
+
+
+def case_scoring(data):
+    from scoring import score_responses
+    sessions = _cycle(data.sessions)
+    return lambda: score_responses(next(sessions), data.question_map, data.description_table)
+
+
+def case_batch_scoring(data):
+    from batch_scoring import build_weight_matrix, responses_to_matrix, score_batch
+    question_ids = list(data.bank.question_ids)
+    weights = build_weight_matrix(question_ids, data.question_map)
+    matrix = responses_to_matrix(data.sessions * (10000 // SYNTHETIC_SESSIONS), question_ids)
+    return lambda: score_batch(matrix, weights)
+
+
+def case_layout(data):
+    # 줄바꿈 캐시를 비워 측정하므로 처음 보는 결과 조합의 2단계(레이아웃 → 그리기) 중 레이아웃 비용입니다.
+    import result_image
+    from font_registry import get_result_fonts
+    fonts = get_result_fonts(data.font_path)
+    results = _cycle(data.results)
+
+    def run():
+        result_image._wrap_cache.clear()
+        result_image.layout_result_image(*next(results), fonts)
+    return run
+
+
+def case_wrap(data, is_world_section=False):
+    # 설명 블록을 캐시 없이 줄바꿈합니다. 종합 블록(단어 단위, 글자 너비 측정이 대부분)과
+    # 세계별 블록(글자 수 기준, 측정 없음)은 경로가 달라 케이스를 나눕니다.
+    import result_image
+    from font_registry import get_result_fonts
+    text_font = get_result_fonts(data.font_path)[4]
+    sections = [name for name in data.description_blocks if (name != 'comprehensive') == is_world_section]
+    texts = [text for name in sections for channel in data.description_blocks[name].values() for text in channel]
+    width_limit = result_image.column_geometry()[3 if is_world_section else 1]
+
+    def run():
+        result_image._wrap_cache.clear()
+        for text in texts:
+            result_image.wrap_description(text, text_font, width_limit, is_world_section)
+    return run
+
+
+def case_safe_text_width(data):
+    from PIL import Image, ImageDraw
+    from font_registry import get_result_fonts
+    from result_image import safe_text_width
+    draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    text_font = get_result_fonts(data.font_path)[4]
+    words = data.description_blocks['comprehensive']['R'][0].split()
+    return lambda: [safe_text_width(draw, word, text_font) for word in words]
+
+
+def case_draw(data):
+    from PIL import Image, ImageDraw
+    from font_registry import get_result_fonts
+    from result_image import draw_ops, layout_result_image
+    ops, height = layout_result_image(*data.results[0], get_result_fonts(data.font_path))
+    return lambda: draw_ops(ImageDraw.Draw(Image.new("RGB", (1200, height), color="#FFFFFF")), ops)
+
+
+def _rendered_image(data):
+    from PIL import Image, ImageDraw
+    from font_registry import get_result_fonts
+    from result_image import draw_ops, layout_result_image
+    ops, height = layout_result_image(*data.results[0], get_result_fonts(data.font_path))
+    img = Image.new("RGB", (1200, height), color="#FFFFFF")
+    draw_ops(ImageDraw.Draw(img), ops)
+    return img, ops
+
+
+def case_png_encode(data):
+    # 인코더 프로필 도입 전 기본값 (RGB PNG, zlib 6)
+    img, _ = _rendered_image(data)
+
+    def run():
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+        return buffer.getvalue()
+    return run
+
+
+def case_encode(data, profile):
+    from result_image import encode_image, exact_colors
+    img, ops = _rendered_image(data)
+    keep_colors = exact_colors(ops)
+    return lambda: encode_image(img, profile, keep_colors)
+
+
+def case_chart(data):
+    from intensity_chart import render_intensity_chart_svg
+    results = _cycle(data.results)
+    return lambda: render_intensity_chart_svg(next(results)[0]['percentages'])
+
+
+def case_render(data):
+    from result_image import generate_result_image
+    results = _cycle(data.results)
+    return lambda: generate_result_image(*next(results), data.font_path)
+
+
+def case_render_strips(data):
+    from strip_render import render_result_image_strips
+    results = _cycle(data.results)
+    return lambda: render_result_image_strips(*next(results), data.font_path)
+
+
+CASES = {
+    'grouping': case_grouping,
+    'scoring': case_scoring,
+    'batch_scoring_10k': case_batch_scoring,
+    'layout': case_layout,
+    'wrap': case_wrap,
+    'wrap_world': functools.partial(case_wrap, is_world_section=True),
+    'safe_text_width': case_safe_text_width,
+    'draw': case_draw,
+    'png_encode': case_png_encode,
+    **{f'encode_{profile}': functools.partial(case_encode, profile=profile) for profile in ('standard', 'fast', 'small', 'archival', 'webp')},
+    'chart': case_chart,
+    'render': case_render,
+    'render_strips': case_render_strips,
+}
+
+
+# --- 결과 색 확인 ---
+def check_result_colors(data, results=None):
+    """모든 인코더 프로필(아틀라스/띠 렌더링 경로 포함)에서 색상 상자 가운데 픽셀이 결과 hex 와 같은지 확인합니다.
+    다른 경우를 (프로필, 기대 hex, 실제 hex) 목록으로 반환합니다."""
+    from PIL import Image
+    from font_registry import get_result_fonts
+    from result_image import ENCODER_PROFILES, generate_result_image, layout_result_image
+    from sprite_atlas import render_result_image
+    fonts = get_result_fonts(data.font_path)
+    mismatches = []
+    for comprehensive_result, world_results in results or data.results:
+        ops, _ = layout_result_image(comprehensive_result, world_results, fonts)
+        x0, y0, x1, y1 = next(op[1] for op in ops if op[0] == 'rect')  # 첫 사각형이 색상 상자입니다.
+        center = (int((x0 + x1) / 2), int((y0 + y1) / 2))
+        for profile in ENCODER_PROFILES:
+            for render in (generate_result_image, render_result_image):
+                image = Image.open(io.BytesIO(render(comprehensive_result, world_results, data.font_path, profile=profile))).convert("RGB")
+                actual = '#{:02X}{:02X}{:02X}'.format(*image.getpixel(center))
+                if actual != comprehensive_result['hex']:
+                    mismatches.append((profile, comprehensive_result['hex'], actual))
+    return mismatches
+
+
+# --- 측정 ---
+def _percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _rss_kb():
+    """(현재 RSS, 최대 RSS) KB. Linux 는 /proc 에서 읽고, 그 밖에는 ru_maxrss 만 (현재 값 None) 씁니다."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            fields = dict(line.split(':', 1) for line in f if line.startswith(('VmRSS', 'VmHWM')))
+        return int(fields['VmRSS'].split()[0]), int(fields['VmHWM'].split()[0])
+    except (OSError, KeyError, ValueError):
+        if resource is None:
+            return None, None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 는 KB, macOS 는 바이트 단위입니다.
+        return None, peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def case_rss_delta_kb(name, font_path=DEFAULT_FONT_PATH):
+    """이 프로세스에서 케이스를 준비한 뒤 1회 실행하는 동안 늘어난 최대 RSS (KB). 측정할 수 없으면 None.
+    Linux 는 준비 후 최대 RSS 기록을 현재 값으로 되돌려(clear_refs) 실행 중 최고점만 잽니다.
+    그 밖의 플랫폼은 ru_maxrss 증가분이라 준비 단계의 최고점보다 낮은 실행은 0 으로 보입니다."""
+    run = CASES[name](BenchmarkData(font_path))
+    try:
+        with open('/proc/self/clear_refs', 'w') as f: f.write('5')
+    except OSError:
+        pass
+    current, peak_before = _rss_kb()
+    run()
+    _, peak_after = _rss_kb()
+    if peak_after is None:
+        return None
+    return max(peak_after - (current if current is not None else peak_before), 0)
+
+
+def measure_rss(name, font_path=DEFAULT_FONT_PATH):
+    """케이스를 새 프로세스에서 실행해 RSS 증가분(KB)을 잽니다. 다른 케이스의 캐시/최고점에 영향받지 않습니다."""
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--rss-case', name, '--font', font_path],
+                          capture_output=True, text=True, cwd=current_dir)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name} RSS 측정 실패: {proc.stderr.strip()[-500:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure(run, iterations, warmup=3):
+    """지연 백분위수(ms)와 1회 실행의 파이썬 힙 할당량을 측정합니다. 할당은 타이밍에 영향이 없도록 별도 실행에서 잽니다.
+    run 이 bytes 를 반환하면(인코딩 케이스) 출력 크기도 기록합니다."""
+    for _ in range(warmup):
+        run()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        run()
+        samples.append((time.perf_counter_ns() - start) / 1e6)
+    samples.sort()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    output = run()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename') if stat.size_diff > 0)
+
+    report = {
+        'iterations': iterations,
+        'p50_ms': round(_percentile(samples, 50), 4),
+        'p90_ms': round(_percentile(samples, 90), 4),
+        'p99_ms': round(_percentile(samples, 99), 4),
+        'mean_ms': round(sum(samples) / len(samples), 4),
+        'alloc_peak_kb': round(peak / 1024, 1),
+        'alloc_retained_kb': round(allocated / 1024, 1),
+    }
+    if isinstance(output, bytes): report['bytes'] = len(output)
+    return report
+
+
+def run_benchmarks(case_names=None, iterations=50, font_path=DEFAULT_FONT_PATH, log=sys.stderr, rss=False):
+    data = BenchmarkData(font_path)
+    results = {}
+    for name in case_names or CASES:
+        results[name] = measure(CASES[name](data), iterations)
+        if rss: results[name]['rss_delta_kb'] = measure_rss(name, font_path)
+        print(f"{name:<18} p50 {results[name]['p50_ms']:9.3f} ms  p99 {results[name]['p99_ms']:9.3f} ms  "
+              f"py heap peak {results[name]['alloc_peak_kb']:9.1f} KB"
+              + (f"  RSS +{results[name]['rss_delta_kb'] / 1024:6.1f} MB" if results[name].get('rss_delta_kb') is not None else "")
+              + (f"  output {results[name]['bytes'] / 1024:8.1f} KB" if 'bytes' in results[name] else ""), file=log)
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cases': results,
+    }
+
+
+def compare_to_baseline(report, baseline, threshold=DEFAULT_THRESHOLD, min_delta_ms=MIN_REGRESSION_MS):
+    """중앙값이 기준선보다 threshold 비율 넘게 느려진 케이스를 (이름, 기준 ms, 현재 ms) 목록으로 반환합니다."""
+    regressions = []
+    for name, current in report['cases'].items():
+        base = baseline.get('cases', {}).get(name)
+        if base and current['p50_ms'] > base['p50_ms'] * (1 + threshold) and current['p50_ms'] - base['p50_ms'] >= min_delta_ms:
+            regressions.append((name, base['p50_ms'], current['p50_ms']))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="채점/레이아웃/렌더링 핫 패스 벤치마크")
+    parser.add_argument('--cases', nargs='*', choices=sorted(CASES), default=None)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--font', default=DEFAULT_FONT_PATH)
+    parser.add_argument('--save', metavar='PATH', help="결과를 기준선 JSON 으로 저장")
+    parser.add_argument('--baseline', metavar='PATH', help="비교할 기준선 JSON")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="허용 지연 증가 비율 (기본 0.25 = 25%%)")
+    parser.add_argument('--json', action='store_true', help="결과를 JSON 으로 출력")
+    parser.add_argument('--check-colors', action='store_true', help="측정 전에 모든 프로필의 색상 상자 픽셀이 결과 hex 와 같은지 확인 (다르면 종료 코드 1)")
+    parser.add_argument('--rss', action='store_true', help="케이스마다 별도 프로세스에서 1회 실행의 최대 RSS 증가분도 측정")
+    parser.add_argument('--rss-case', choices=sorted(CASES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rss_case:
+        # --rss 의 하위 프로세스: 케이스 하나의 RSS 증가분만 출력합니다.
+        print(json.dumps(case_rss_delta_kb(args.rss_case, args.font)))
+        sys.exit(0)
+
+    if args.check_colors:
+        mismatches = check_result_colors(BenchmarkData(args.font))
+        for profile, expected, actual in mismatches:
+            print(f"[색 불일치] {profile}: {expected} → {actual}", file=sys.stderr)
+        if mismatches:
+            sys.exit(1)
+        print(f"색상 상자 확인: {SYNTHETIC_SESSIONS}개 결과 × 프로필 모두 일치", file=sys.stderr)
+
+    report = run_benchmarks(args.cases, args.iterations, args.font, rss=args.rss)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f: json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f: baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.threshold)
+        for name, before, after in regressions:
+            print(f"[느려짐] {name}: {before:.3f} ms → {after:.3f} ms (+{(after / before - 1) * 100:.0f}%)", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,307 @@
+# --- 대량 결과 이미지 생성 CLI ---
+# 워크숍 참가자 응답(CSV/JSONL)을 스트리밍으로 읽어 채점하고, 프로세스 풀에서 결과 PNG 를 렌더링해
+# 디렉터리 또는 zip 파일로 저장합니다.
+#
+#   python bulk_reports.py responses.jsonl --out results/        # 디렉터리
+#   python bulk_reports.py responses.csv --out results.zip        # zip
+#   --profile fast|small|archival|webp|streamed 로 인코더 프로필 선택 (기본 standard, result_image.ENCODER_PROFILES)
+#
+# 입력 형식
+#   JSONL: 한 줄에 {"id": "참가자", "responses": {"문항 id": -4~4, ...}}
+#   CSV:   참가자 id 열(--id-field) + 문항 id 열("12" 또는 "q12"), 빈 칸은 미응답
+# 형식이 잘못된 줄(JSON 오류, 정수가 아닌 값, -4~4 밖의 점수, id/응답 누락)과 중복 참가자 id 는
+# 실패로 세고 나머지는 계속 처리합니다.
+#
+# 재개: 이미 출력에 있는 참가자는 건너뜁니다.
+#   디렉터리: 파일을 임시 이름으로 쓴 뒤 교체합니다.
+#   zip:      청크마다 '<출력>.parts/' 에 별도 part zip 을 (임시 이름 → 교체로) 쓰고, 끝나면 하나로 합칩니다.
+#             중단되면 완료된 part 는 그대로 남고, 잘리거나 깨진 part 는 무시되어 그 참가자만 다시 렌더링합니다.
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FONT_PATH = os.path.join(current_dir, 'NanumGothic.ttf')
+DEFAULT_CHUNK_SIZE = 32
+DEFAULT_PROFILE = 'standard'
+
+
+# --- 입력 스트리밍 ---
+def _question_id(column):
+    match = re.fullmatch(r'[qQ]?(\d+)', column.strip())
+    return int(match.group(1)) if match else None
+
+
+def _score(value, q_id, text=False):
+    # scoring_service.parse_responses 와 같은 규칙: -4~4 정수 (CSV 칸은 text=True 로 문자열을 정수로 읽습니다)
+    if text:
+        try:
+            value = int(value.strip())
+        except ValueError:
+            raise ValueError(f"문항 {q_id} 의 점수가 정수가 아닙니다: {value!r}")
+    if not isinstance(value, int) or isinstance(value, bool) or not -4 <= value <= 4:
+        raise ValueError(f"문항 {q_id} 의 점수는 -4~4 정수여야 합니다: {value!r}")
+    return value
+
+
+def parse_responses(raw, question_ids=None):
+    """JSON 의 {"문항 id": 점수} 객체를 검사해 {문항 id: 점수} 로 반환합니다. 형식이 잘못되면 ValueError.
+    question_ids 를 주면 그 안에 없는 문항 id 도 오류입니다 (population_stats 도 같은 규칙을 씁니다)."""
+    if not isinstance(raw, dict):
+        raise ValueError("'responses' 객체({문항 id: 점수})가 필요합니다.")
+    responses = {}
+    for key, value in raw.items():
+        try:
+            q_id = int(key)
+        except ValueError:
+            raise ValueError(f"문항 id 가 정수가 아닙니다: {key!r}")
+        if question_ids is not None and q_id not in question_ids:
+            raise ValueError(f"알 수 없는 문항 id: {q_id}")
+        responses[q_id] = _score(value, q_id)
+    return responses
+
+
+def _parse_json_record(line, id_field):
+    record = json.loads(line)
+    if not isinstance(record, dict) or record.get(id_field) in (None, ''):
+        raise ValueError(f"'{id_field}' 가 없습니다.")
+    return str(record[id_field]), parse_responses(record.get('responses'))
+
+
+def read_records(path, id_field='id'):
+    """(참가자 id, {문항 id: 점수}, 오류 메시지 또는 None) 을 한 건씩 내보냅니다. 파일 전체를 메모리에 올리지 않습니다.
+    형식이 잘못된 레코드는 응답 None 과 오류 메시지로 내보내며, 참가자 id 를 알 수 없으면 '<줄 N>' 을 씁니다."""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if path.lower().endswith('.csv'):
+            reader = csv.DictReader(f)
+            columns = [(name, _question_id(name)) for name in reader.fieldnames or [] if name != id_field]
+            for record in reader:
+                participant_id = record.get(id_field)
+                try:
+                    if participant_id in (None, ''):
+                        raise ValueError(f"'{id_field}' 열이 비어 있습니다.")
+                    responses = {q_id: _score(record[name], q_id, text=True) for name, q_id in columns
+                                 if q_id is not None and record[name] not in (None, '')}
+                    yield participant_id, responses, None
+                except ValueError as e:
+                    yield participant_id or f"<줄 {reader.line_num}>", None, str(e)
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield (*_parse_json_record(line, id_field), None)
+                except ValueError as e:  # json.JSONDecodeError 포함
+                    yield f"<줄 {line_number}>", None, str(e)
+
+
+def output_name(participant_id, extension='.png'):
+    """참가자 id 를 안전한 파일 이름으로 바꿉니다.
+    바꾼 글자가 있으면 원래 id 의 짧은 해시를 붙여 서로 다른 id('a b', 'a_b')가 같은 이름이 되지 않게 합니다."""
+    name = re.sub(r'[^0-9A-Za-z가-힣._-]', '_', participant_id)
+    if name != participant_id or not name:
+        name += '-' + hashlib.sha1(participant_id.encode('utf-8')).hexdigest()[:8]
+    return name + extension
+
+
+# --- 워커 ---
+_worker = {}
+
+
+def _init_worker(font_path, profile):
+    from question_bank import open_bank
+    bank = open_bank()
+    _worker['question_map'] = {q['id']: q for q in bank.to_questions_data()['questions']}
+    _worker['description_table'] = bank.description_table()
+    _worker['font_path'] = font_path
+    _worker['profile'] = profile
+
+
+def _render_chunk(records):
+    """[(참가자 id, 응답)] → [(참가자 id, 이미지 bytes 또는 None, 오류 메시지 또는 None)]"""
+    from scoring import score_responses
+    from sprite_atlas import render_result_image
+    results = []
+    for participant_id, responses in records:
+        try:
+            unknown = [q_id for q_id in responses if q_id not in _worker['question_map']]
+            if unknown:
+                raise ValueError(f"알 수 없는 문항 id: {unknown[:5]}")
+            comprehensive_result, world_results = score_responses(responses, _worker['question_map'], _worker['description_table'])
+            results.append((participant_id, render_result_image(comprehensive_result, world_results, _worker['font_path'], profile=_worker['profile']), None))
+        except Exception as e:
+            results.append((participant_id, None, str(e)))
+    return results
+
+
+# --- 출력 ---
+class DirectoryOutput:
+    def __init__(self, path, extension='.png'):
+        self.path = path
+        self.extension = extension
+        os.makedirs(path, exist_ok=True)
+
+    def completed(self):
+        return {name for name in os.listdir(self.path) if name.endswith(self.extension)}
+
+    def write(self, items):
+        for name, data in items:
+            target = os.path.join(self.path, name)
+            with open(target + '.tmp', 'wb') as f: f.write(data)
+            os.replace(target + '.tmp', target)
+
+    def finish(self):
+        pass
+
+
+def _zip_names(path):
+    """zip 의 항목 이름. 잘리거나 깨진 파일이면 None."""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            return set(zf.namelist())
+    except (OSError, zipfile.BadZipFile):
+        return None
+
+
+class ZipOutput:
+    """청크마다 '<path>.parts/part-N.zip' 을 쓰고 finish() 에서 path 하나로 합칩니다.
+    각 part 는 완성된 뒤에만 보이므로 중단돼도 이미 쓴 part 와 기존 zip 은 손상되지 않습니다."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parts_dir = path + '.parts'
+        os.makedirs(self.parts_dir, exist_ok=True)
+        numbers = [int(m.group(1)) for m in (re.fullmatch(r'part-(\d+)\.zip', name) for name in os.listdir(self.parts_dir)) if m]
+        self._next_part = max(numbers, default=0) + 1
+
+    def _parts(self):
+        return sorted(os.path.join(self.parts_dir, name) for name in os.listdir(self.parts_dir) if re.fullmatch(r'part-\d+\.zip', name))
+
+    def completed(self):
+        names = set()
+        for path in ([self.path] if os.path.exists(self.path) else []) + self._parts():
+            names |= _zip_names(path) or set()
+        return names
+
+    def write(self, items):
+        if not items:
+            return
+        target = os.path.join(self.parts_dir, f'part-{self._next_part:06d}.zip')
+        self._next_part += 1
+        # 이미지는 이미 압축돼 있으므로 STORED 로 저장합니다.
+        with zipfile.ZipFile(target + '.tmp', 'w', compression=zipfile.ZIP_STORED) as zf:
+            for name, data in items:
+                zf.writestr(name, data)
+        os.replace(target + '.tmp', target)
+
+    def finish(self):
+        """기존 zip(있으면)과 온전한 part 들을 새 zip 으로 합쳐 교체하고 part 디렉터리를 지웁니다."""
+        sources = ([self.path] if os.path.exists(self.path) and _zip_names(self.path) is not None else [])
+        sources += [path for path in self._parts() if _zip_names(path) is not None]
+        if sources != [self.path]:
+            seen = set()
+            with zipfile.ZipFile(self.path + '.tmp', 'w', compression=zipfile.ZIP_STORED) as out:
+                for source in sources:
+                    with zipfile.ZipFile(source) as zf:
+                        for info in zf.infolist():
+                            if info.filename not in seen:
+                                seen.add(info.filename)
+                                out.writestr(info, zf.read(info))
+            os.replace(self.path + '.tmp', self.path)
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
+
+
+# --- 실행 ---
+def _valid_records(records, skip, extension, stats, log):
+    """형식 오류·중복 id 를 실패로 세고, 이미 출력된 참가자를 건너뛴 (참가자 id, 응답) 만 내보냅니다."""
+    seen = set()
+    for participant_id, responses, error in records:
+        name = output_name(participant_id, extension)
+        if error is None and name in seen:
+            error = "중복 참가자 id"
+        if error is not None:
+            stats['failed'] += 1
+            print(f"[실패] {participant_id}: {error}", file=log)
+            continue
+        seen.add(name)
+        if name not in skip:
+            yield participant_id, responses
+
+
+def _chunks(records, size):
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run(input_path, out_path, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, id_field='id', font_path=DEFAULT_FONT_PATH, progress_every=2.0, log=sys.stderr, profile=DEFAULT_PROFILE):
+    """대량 생성을 실행하고 통계 dict 를 반환합니다."""
+    from result_image import image_format
+    extension = image_format(profile)[1]
+    workers = workers or os.cpu_count() or 1
+    output = ZipOutput(out_path) if out_path.lower().endswith('.zip') else DirectoryOutput(out_path, extension)
+    skip = output.completed()
+    stats = {'written': 0, 'skipped': len(skip), 'failed': 0, 'seconds': 0.0, 'workers': workers}
+
+    start = last_report = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(font_path, profile)) as pool:
+        chunks = _chunks(_valid_records(read_records(input_path, id_field), skip, extension, stats, log), chunk_size)
+        pending = set()
+        # 제출해 둔 청크 수를 워커 수의 2배로 제한해 입력을 스트리밍 상태로 유지합니다.
+        while True:
+            while len(pending) < workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None: break
+                pending.add(pool.submit(_render_chunk, chunk))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                items = []
+                for participant_id, data, error in future.result():
+                    if data is None:
+                        stats['failed'] += 1
+                        print(f"[실패] {participant_id}: {error}", file=log)
+                    else:
+                        items.append((output_name(participant_id, extension), data))
+                output.write(items)
+                stats['written'] += len(items)
+
+            now = time.perf_counter()
+            if now - last_report >= progress_every:
+                last_report = now
+                rate = stats['written'] / (now - start)
+                print(f"[진행] {stats['written']}장 완료, 실패 {stats['failed']}, {rate:.1f}장/초 ({rate / workers:.1f}장/초/코어)", file=log)
+
+    output.finish()
+    stats['seconds'] = time.perf_counter() - start
+    stats['images_per_second'] = stats['written'] / stats['seconds'] if stats['seconds'] else 0.0
+    stats['images_per_second_per_core'] = stats['images_per_second'] / workers
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="응답 파일(CSV/JSONL)로 결과 이미지를 대량 생성합니다.")
+    parser.add_argument('input', help="응답 파일 (.csv 또는 .jsonl)")
+    parser.add_argument('--out', required=True, help="출력 디렉터리 또는 .zip 파일")
+    parser.add_argument('--workers', type=int, default=None, help="프로세스 수 (기본: CPU 수)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="워커에 한 번에 넘기는 참가자 수")
+    parser.add_argument('--id-field', default='id', help="참가자 id 필드/열 이름")
+    parser.add_argument('--font', default=DEFAULT_FONT_PATH)
+    parser.add_argument('--profile', default=DEFAULT_PROFILE, help="인코더 프로필 (standard, fast, small, archival, webp, streamed)")
+    args = parser.parse_args()
+
+    result = run(args.input, args.out, args.workers, args.chunk_size, args.id_field, args.font, profile=args.profile)
+    print(f"완료: {result['written']}장 생성, {result['skipped']}장 건너뜀, {result['failed']}건 실패, "
+          f"{result['seconds']:.1f}초, {result['images_per_second']:.1f}장/초 ({result['images_per_second_per_core']:.2f}장/초/코어)")
@@ -0,0 +1,72 @@
+# --- 프로세스 전역 폰트 레지스트리 ---
+# (경로, 크기)별 TrueType 폰트를 프로세스당 한 번만 로드하고, Streamlit 스크립트 스레드 간에 공유합니다.
+# 폰트별 글리프 advance 캐시를 두어 텍스트 너비 측정 시 FreeType 호출을 반복하지 않습니다.
+import functools
+import logging
+import os
+import threading
+import weakref
+
+from PIL import ImageFont
+
+logger = logging.getLogger(__name__)
+
+# 결과 이미지에서 쓰는 폰트 크기 (제목, 섹션 제목, 소제목, 굵은 본문, 본문, HEX)
+RESULT_FONT_SIZES = (36, 28, 24, 20, 16, 24)
+
+_fonts = {}
+_advances = weakref.WeakKeyDictionary()
+_reported_missing = set()
+_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=16)
+def font_identity(font_path):
+    """글꼴 파일을 구분하는 (절대 경로, 크기, 수정 시각). 파일이 없으면 경로만 씁니다.
+    글꼴은 프로세스당 한 번 로드되므로 같은 프로세스 안에서는 다시 확인하지 않습니다."""
+    path = os.path.abspath(font_path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (path,)
+    return (path, stat.st_size, stat.st_mtime_ns)
+
+
+def get_font(font_path, size):
+    """(font_path, size) 폰트를 반환합니다. 로드 실패 시 기본 폰트를 쓰고, 경로별로 한 번만 경고합니다."""
+    key = (font_path, size)
+    font = _fonts.get(key)
+    if font is not None:
+        return font
+    with _lock:
+        font = _fonts.get(key)
+        if font is None:
+            try:
+                font = ImageFont.truetype(font_path, size)
+            except IOError:
+                if font_path not in _reported_missing:
+                    _reported_missing.add(font_path)
+                    logger.warning("폰트 '%s'을(를) 불러올 수 없어 기본 폰트를 사용합니다.", font_path)
+                font = ImageFont.load_default()
+            _fonts[key] = font
+    return font
+
+
+def get_result_fonts(font_path):
+    """generate_result_image 가 쓰는 폰트 6개를 순서대로 반환합니다."""
+    return tuple(get_font(font_path, size) for size in RESULT_FONT_SIZES)
+
+
+def measure_text(font, text):
+    """줄바꿈 없는 텍스트 너비를 글리프 advance 합으로 계산합니다. 글자별 advance 는 폰트마다 캐시합니다."""
+    advances = _advances.get(font)
+    if advances is None:
+        with _lock: advances = _advances.setdefault(font, {})
+    width = 0
+    for ch in text:
+        advance = advances.get(ch)
+        if advance is None:
+            advance = advances[ch] = font.getlength(ch)
+        width += advance
+    return width
+
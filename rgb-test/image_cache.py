@@ -0,0 +1,107 @@
+# --- 결과 이미지 캐시 ---
+# 결과 이미지는 HEX, 퍼센티지 3개, 종합 구간 3개, 세계별 구간 9개와 그 구간의 설명 문구, 글꼴, 인코더 프로필로 결정되므로
+# 이 서명을 키로 메모리(LRU)와 선택적 디스크 캐시에 저장해 재렌더링을 피합니다.
+# 설명 문구(descriptions.json)나 글꼴 파일이 바뀌면 키가 달라지므로 CACHE_VERSION 을 올리지 않아도 됩니다.
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from font_registry import font_identity
+from result_image import DEFAULT_ENCODER_PROFILE, DOWNLOAD_ENCODER_PROFILE, image_format
+from sprite_atlas import render_result_image
+
+# 렌더링 레이아웃(코드)이 바뀌면 올려서 디스크에 남은 이전 이미지를 무효화합니다.
+CACHE_VERSION = 5
+DEFAULT_MAX_ENTRIES = 256
+
+
+def result_signature(comprehensive_result, world_results):
+    """이미지 내용을 결정하는 값(설명 문구 포함)만 모은 튜플을 반환합니다."""
+    percentages = comprehensive_result['percentages']
+    indices = comprehensive_result['indices']
+    descriptions = comprehensive_result['descriptions']
+    return (
+        comprehensive_result['hex'],
+        tuple(percentages[k] for k in "RGB"),
+        tuple(indices[k] for k in "RGB"),
+        tuple((code, tuple(data['indices'][k] for k in "RGB")) for code, data in world_results.items()),
+        tuple(descriptions[k] for k in "RGB"),
+        tuple(data[f'description_{k}'] for data in world_results.values() for k in "RGB"),
+    )
+
+
+def signature_key(signature, profile=DEFAULT_ENCODER_PROFILE, font_path=None):
+    """서명 튜플(+ 인코더 프로필, 글꼴)을 디스크 파일명으로도 쓸 수 있는 고정 길이 키로 변환합니다."""
+    font = font_identity(font_path) if font_path else None
+    return hashlib.sha1(repr((CACHE_VERSION, profile, font, signature)).encode('utf-8')).hexdigest()
+
+
+class ImageCache:
+    """서명 키 → PNG bytes. 메모리 LRU + (cache_dir 지정 시) 디스크 저장. 스레드 안전합니다."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir: os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key, profile):
+        return os.path.join(self.cache_dir, key + image_format(profile)[1])
+
+    def get(self, key, profile=DEFAULT_ENCODER_PROFILE):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key, profile), 'rb') as f: data = f.read()
+            except OSError:
+                data = None
+            if data is not None:
+                self._remember(key, data)
+                with self._lock: self.hits += 1
+                return data
+        with self._lock: self.misses += 1
+        return None
+
+    def put(self, key, data, profile=DEFAULT_ENCODER_PROFILE):
+        self._remember(key, data)
+        if self.cache_dir:
+            # 임시 파일에 쓴 뒤 교체하여 동시 렌더링 시 깨진 파일이 읽히지 않도록 합니다.
+            tmp_path = f"{self._disk_path(key, profile)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f: f.write(data)
+                os.replace(tmp_path, self._disk_path(key, profile))
+            except OSError:
+                pass
+
+    def _remember(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_render(self, comprehensive_result, world_results, font_path, profile=DEFAULT_ENCODER_PROFILE):
+        key = signature_key(result_signature(comprehensive_result, world_results), profile, font_path)
+        data = self.get(key, profile)
+        if data is None:
+            data = render_result_image(comprehensive_result, world_results, font_path, profile=profile)
+            self.put(key, data, profile)
+        return data
+
+
+# 프로세스 전역 기본 캐시 (RGB_IMAGE_CACHE_DIR 환경변수로 디스크 캐시 활성화)
+default_image_cache = ImageCache(cache_dir=os.environ.get('RGB_IMAGE_CACHE_DIR') or None)
+
+
+def get_result_image(comprehensive_result, world_results, font_path, cache=None, profile=DEFAULT_ENCODER_PROFILE):
+    """캐시를 거쳐 결과 이미지 bytes 를 반환합니다 (profile: result_image.ENCODER_PROFILES)."""
+    return (cache or default_image_cache).get_or_render(comprehensive_result, world_results, font_path, profile)
@@ -0,0 +1,42 @@
+# --- 유형별 강도 시각화 (SVG) ---
+# matplotlib 그림 객체 없이 R/G/B 가로 막대 차트를 SVG 문자열로 만듭니다.
+# 매 rerun 마다 Figure 를 만들고 닫지 않던 문제(메모리 증가)와 pyplot import 비용을 없앱니다.
+from html import escape
+
+CHART_LABELS = {'R': "진취형 (R)", 'G': "중재형 (G)", 'B': "신중형 (B)"}
+CHART_COLORS = {'R': '#E63946', 'G': '#7FB069', 'B': '#457B9D'}
+CHART_X_MAX = 115  # 기존 ax.set_xlim(0, 115)
+
+
+def render_intensity_chart_svg(percentages, width=1000, height=500, label_width=150):
+    """퍼센티지 dict({'R','G','B'})를 받아 기존 barh 차트와 같은 배치의 SVG 를 반환합니다.
+
+    위에서부터 B, G, R 순서(barh 의 y 축 순서), 막대 높이는 칸의 60%, 값 라벨은 막대 끝 + 2 위치입니다.
+    """
+    plot_width = width - label_width - 10
+    slot_height = height / 3
+    bar_height = slot_height * 0.6
+    scale = plot_width / CHART_X_MAX
+
+    parts = [
+        f"<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 {width} {height}' width='100%' "
+        f"style='font-family: NanumGothic, sans-serif;' role='img' aria-label='유형별 강도 시각화'>"
+    ]
+    for row, k in enumerate(['B', 'G', 'R']):
+        value = percentages[k]
+        center_y = slot_height * row + slot_height / 2
+        bar_y = center_y - bar_height / 2
+        bar_length = max(value, 0) * scale
+        parts.append(
+            f"<text x='{label_width - 10}' y='{center_y:.1f}' text-anchor='end' dominant-baseline='middle' "
+            f"font-size='20' fill='#333333'>{escape(CHART_LABELS[k])}</text>"
+        )
+        parts.append(
+            f"<rect x='{label_width}' y='{bar_y:.1f}' width='{bar_length:.1f}' height='{bar_height:.1f}' fill='{CHART_COLORS[k]}'/>"
+        )
+        parts.append(
+            f"<text x='{label_width + (value + 2) * scale:.1f}' y='{center_y:.1f}' dominant-baseline='middle' "
+            f"font-size='17' fill='#333333'>{value}%</text>"
+        )
+    parts.append("</svg>")
+    return "".join(parts)
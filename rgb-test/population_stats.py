@@ -0,0 +1,288 @@
+# --- 보관 응답 스트리밍 집계 ---
+# 수천만 건의 보관 세션을 메모리에 올리지 않고 청크 단위로 읽어 모집단 통계를 냅니다.
+#   - 종합 HEX(comp_hex) 분포, 채널별 종합 구간(0~9) 히스토그램
+#   - 세계(i/a/s) × 채널(R/G/B)별 설명 구간(get_world_description_index) 히스토그램
+#   - 문항별 응답 수/평균/분산
+# 채점은 batch_scoring.score_batch 를 그대로 사용하므로 세션 단위 채점과 값이 같습니다.
+# 레코드는 bulk_reports 와 같은 규칙(알려진 문항 id, -4~4 정수 점수)으로 검사하고, 어긋난 레코드는
+# 중단하지 않고 건너뛰어 제외 건수(rejected)로 통계와 함께 보고합니다.
+#
+# 누산기(PopulationStats)는 크기가 고정된 배열(+관측된 HEX 수만큼의 카운터)이라 입력 크기와 무관하게
+# 메모리가 일정하고, 워커 프로세스별 결과를 merge 로 합칩니다. 상태 파일(--state)에 누산기와 처리한
+# 파일 목록을 저장해 두면, 새 날짜 파일이 추가될 때 그 파일만 읽어 갱신합니다.
+#
+#   python population_stats.py archive/2024-*.jsonl --state stats_state.json [--workers N] [--json]
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch_scoring import build_weight_matrix, score_batch
+from bulk_reports import parse_responses
+from question_bank import open_bank
+from scoring import BAND_COUNT, WORLDS
+
+STATE_VERSION = 1
+DEFAULT_CHUNK_ROWS = 65536
+REJECT_LOG_LIMIT = 5  # 파일마다 제외 사유를 출력할 최대 건수
+
+
+class PopulationStats:
+    """병합 가능한 고정 크기 누산기. 문항 축은 question_ids 순서를 따릅니다."""
+
+    def __init__(self, question_ids):
+        self.question_ids = [int(q_id) for q_id in question_ids]
+        self.sessions = 0
+        self.rejected = 0
+        self.hex_counts = Counter()
+        self.comprehensive_bands = np.zeros((3, BAND_COUNT), dtype=np.int64)
+        self.world_bands = np.zeros((len(WORLDS), 3, BAND_COUNT), dtype=np.int64)
+        # 응답 값이 정수이므로 합/제곱합을 정수로 누적해 병합 순서와 관계없이 정확합니다.
+        self.answered = np.zeros(len(self.question_ids), dtype=np.int64)
+        self.response_sum = np.zeros(len(self.question_ids), dtype=np.int64)
+        self.response_sq_sum = np.zeros(len(self.question_ids), dtype=np.int64)
+
+    def add_batch(self, responses, answered, weights):
+        """N × Q 응답 행렬(미응답 0)과 응답 여부 마스크를 누적합니다."""
+        if not len(responses):
+            return
+        result = score_batch(responses, weights)
+        self.sessions += len(responses)
+        # '#RRGGBB' 문자열 대신 24비트 정수로 세어 청크당 np.unique 한 번으로 끝냅니다.
+        rgb = result['rgb'].astype(np.int64)
+        packed, counts = np.unique((rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2], return_counts=True)
+        self.hex_counts.update(dict(zip(packed.tolist(), counts.tolist())))
+        for ch in range(3):
+            self.comprehensive_bands[ch] += np.bincount(result['comprehensive_indices'][:, ch], minlength=BAND_COUNT)
+            for w in range(len(WORLDS)):
+                self.world_bands[w, ch] += np.bincount(result['world_indices'][:, w, ch], minlength=BAND_COUNT)
+        values = responses.astype(np.int64)
+        self.answered += answered.sum(axis=0)
+        self.response_sum += values.sum(axis=0)
+        self.response_sq_sum += (values * values).sum(axis=0)
+
+    def merge(self, other):
+        if other.question_ids != self.question_ids:
+            raise ValueError("문항 구성이 다른 누산기는 합칠 수 없습니다.")
+        self.sessions += other.sessions
+        self.rejected += other.rejected
+        self.hex_counts.update(other.hex_counts)
+        self.comprehensive_bands += other.comprehensive_bands
+        self.world_bands += other.world_bands
+        self.answered += other.answered
+        self.response_sum += other.response_sum
+        self.response_sq_sum += other.response_sq_sum
+        return self
+
+    def summary(self, top_hex=20):
+        """사람이 읽을 통계 dict. 평균/분산은 응답한 세션 기준(모분산)입니다."""
+        n = np.maximum(self.answered, 1)
+        mean = self.response_sum / n
+        variance = self.response_sq_sum / n - mean * mean
+        return {
+            'sessions': self.sessions,
+            'rejected': self.rejected,
+            'distinct_hex': len(self.hex_counts),
+            'top_hex': [['#{:06X}'.format(packed), count] for packed, count in self.hex_counts.most_common(top_hex)],
+            'comprehensive_bands': {ch: self.comprehensive_bands[i].tolist() for i, ch in enumerate("RGB")},
+            'world_bands': {world: {ch: self.world_bands[w, i].tolist() for i, ch in enumerate("RGB")} for w, world in enumerate(WORLDS)},
+            'questions': {q_id: {'answered': int(self.answered[i]),
+                                 'mean': round(float(mean[i]), 4) if self.answered[i] else None,
+                                 'variance': round(float(variance[i]), 4) if self.answered[i] else None}
+                          for i, q_id in enumerate(self.question_ids)},
+        }
+
+    def to_state(self):
+        return {
+            'question_ids': self.question_ids,
+            'sessions': self.sessions,
+            'rejected': self.rejected,
+            'hex_counts': {'{:06X}'.format(packed): count for packed, count in self.hex_counts.items()},
+            'comprehensive_bands': self.comprehensive_bands.tolist(),
+            'world_bands': self.world_bands.tolist(),
+            'answered': self.answered.tolist(),
+            'response_sum': self.response_sum.tolist(),
+            'response_sq_sum': self.response_sq_sum.tolist(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        stats = cls(state['question_ids'])
+        stats.sessions = state['sessions']
+        stats.rejected = state.get('rejected', 0)
+        stats.hex_counts = Counter({int(key, 16): count for key, count in state['hex_counts'].items()})
+        for name in ('comprehensive_bands', 'world_bands', 'answered', 'response_sum', 'response_sq_sum'):
+            setattr(stats, name, np.array(state[name], dtype=np.int64))
+        return stats
+
+
+# --- 입력 (JSONL / Parquet) ---
+def _question_column(name):
+    name = str(name).strip()
+    if name[:1] in ('q', 'Q'): name = name[1:]
+    return int(name) if name.isdigit() else None
+
+
+def _log_reject(log, rejected, path, where, error):
+    if log is not None and rejected <= REJECT_LOG_LIMIT:
+        print(f"[제외] {path} {where}: {error}", file=log)
+
+
+def iter_response_chunks(path, question_ids, chunk_rows=DEFAULT_CHUNK_ROWS, log=None):
+    """파일을 (N × Q int8 응답, N × Q bool 응답 여부, 제외한 레코드 수) 청크로 읽습니다.
+
+    JSONL 은 한 줄에 {"responses": {"문항 id": 점수}} 형식,
+    Parquet 은 문항 id 열("12" 또는 "q12")을 가진 넓은 형식(미응답은 null)이어야 합니다.
+    점수가 -4~4 정수가 아니거나(JSONL 은 모르는 문항 id·깨진 줄 포함) 형식이 잘못된 레코드는 건너뛰고
+    그 수를 세어 함께 내보냅니다. 제외 사유는 log 에 파일마다 REJECT_LOG_LIMIT 건까지 출력합니다.
+    """
+    column = {q_id: i for i, q_id in enumerate(question_ids)}
+    rejected = 0
+    if path.lower().endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet 입력에는 pyarrow 가 필요합니다 (pip install pyarrow).")
+        parquet = pq.ParquetFile(path)
+        names = [name for name in parquet.schema_arrow.names if _question_column(name) in column]
+        first_row = 0
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=names):
+            responses = np.zeros((batch.num_rows, len(question_ids)), dtype=np.int8)
+            answered = np.zeros(responses.shape, dtype=bool)
+            bad = np.zeros(batch.num_rows, dtype=bool)
+            for name, array in zip(batch.schema.names, batch.columns):
+                i = column[_question_column(name)]
+                mask = array.is_valid().to_numpy(zero_copy_only=False)
+                # int8 로 옮기기 전에 검사합니다 (범위 밖 값은 그대로 넣으면 넘치거나 평균/분산을 왜곡).
+                values = np.asarray(array.fill_null(0).to_numpy(zero_copy_only=False), dtype=np.float64)
+                invalid = mask & ((values != np.round(values)) | (values < -4) | (values > 4))
+                bad |= invalid
+                responses[mask & ~invalid, i] = values[mask & ~invalid]
+                answered[:, i] = mask
+            if bad.any():
+                for row in np.flatnonzero(bad)[:max(REJECT_LOG_LIMIT - rejected, 0)]:
+                    _log_reject(log, rejected + 1, path, f"행 {first_row + row}", "점수는 -4~4 정수여야 합니다.")
+                rejected += int(bad.sum())
+                responses, answered = responses[~bad], answered[~bad]
+            first_row += batch.num_rows
+            yield responses, answered, int(bad.sum())
+        return
+
+    responses = np.zeros((chunk_rows, len(question_ids)), dtype=np.int8)
+    answered = np.zeros(responses.shape, dtype=bool)
+    n = chunk_rejected = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("레코드가 JSON 객체가 아닙니다.")
+                values = parse_responses(record.get('responses'), column)
+            except ValueError as e:  # json.JSONDecodeError 포함
+                rejected += 1
+                chunk_rejected += 1
+                _log_reject(log, rejected, path, f"줄 {line_number}", e)
+                continue
+            for q_id, value in values.items():
+                responses[n, column[q_id]] = value
+                answered[n, column[q_id]] = True
+            n += 1
+            if n == chunk_rows:
+                yield responses, answered, chunk_rejected
+                responses = np.zeros_like(responses)
+                answered = np.zeros_like(answered)
+                n = chunk_rejected = 0
+    if n or chunk_rejected:
+        yield responses[:n], answered[:n], chunk_rejected
+
+
+def aggregate_file(path, chunk_rows=DEFAULT_CHUNK_ROWS, log=sys.stderr):
+    """파일 하나를 집계한 PopulationStats 를 반환합니다 (워커 프로세스에서 실행)."""
+    bank = open_bank()
+    question_ids = list(bank.question_ids)
+    question_map = {q['id']: q for q in bank.to_questions_data()['questions']}
+    weights = build_weight_matrix(question_ids, question_map)
+    stats = PopulationStats(question_ids)
+    for responses, answered, rejected in iter_response_chunks(path, question_ids, chunk_rows, log):
+        stats.add_batch(responses, answered, weights)
+        stats.rejected += rejected
+    return stats
+
+
+# --- 증분 갱신 ---
+def _file_fingerprint(path):
+    st = os.stat(path)
+    return [st.st_size, int(st.st_mtime)]
+
+
+def load_state(path):
+    """상태 파일에서 (누산기, {파일: [크기, 수정 시각]}) 를 읽습니다. 없으면 (None, {})."""
+    if not path or not os.path.exists(path):
+        return None, {}
+    with open(path, 'r', encoding='utf-8') as f: state = json.load(f)
+    if state.get('version') != STATE_VERSION:
+        raise ValueError(f"상태 파일 버전이 다릅니다: {state.get('version')} (기대값 {STATE_VERSION})")
+    return PopulationStats.from_state(state['stats']), state['files']
+
+
+def save_state(path, stats, files):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': STATE_VERSION, 'files': files, 'stats': stats.to_state()}, f)
+    os.replace(tmp_path, path)
+
+
+def update_stats(paths, state_path=None, workers=None, chunk_rows=DEFAULT_CHUNK_ROWS, log=sys.stderr):
+    """아직 집계하지 않은 파일만 워커 프로세스에서 집계해 기존 누산기에 합치고 반환합니다."""
+    stats, files = load_state(state_path)
+    new_paths = []
+    for path in paths:
+        key = os.path.abspath(path)
+        if key not in files:
+            new_paths.append(path)
+        elif files[key] != _file_fingerprint(path):
+            # 이미 합친 파일이 바뀌면 중복 집계를 피할 수 없으므로 상태를 다시 만들어야 합니다.
+            raise ValueError(f"이미 집계한 파일이 변경되었습니다: {path} (상태 파일 없이 다시 집계하세요)")
+
+    if new_paths:
+        with ProcessPoolExecutor(max_workers=workers or min(len(new_paths), os.cpu_count() or 1)) as pool:
+            for path, partial in zip(new_paths, pool.map(aggregate_file, new_paths, [chunk_rows] * len(new_paths))):
+                stats = partial if stats is None else stats.merge(partial)
+                files[os.path.abspath(path)] = _file_fingerprint(path)
+                print(f"[집계] {path}: {partial.sessions}건 (제외 {partial.rejected}건)", file=log)
+    elif stats is None:
+        stats = PopulationStats(open_bank().question_ids)
+
+    if state_path:
+        save_state(state_path, stats, files)
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="보관 응답(JSONL/Parquet)의 모집단 통계를 스트리밍으로 집계합니다.")
+    parser.add_argument('inputs', nargs='*', help="응답 파일 (.jsonl 또는 .parquet)")
+    parser.add_argument('--state', default=None, help="누산기 상태 파일 (증분 갱신용)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--top-hex', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help="요약을 JSON 으로 출력")
+    args = parser.parse_args()
+
+    summary = update_stats(args.inputs, args.state, args.workers, args.chunk_rows).summary(args.top_hex)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False))
+    else:
+        print(f"세션 {summary['sessions']}건 (형식 오류로 제외 {summary['rejected']}건), 서로 다른 HEX {summary['distinct_hex']}개")
+        for hex_code, count in summary['top_hex']:
+            print(f"  {hex_code}  {count}")
+        for ch, bands in summary['comprehensive_bands'].items():
+            print(f"종합 {ch} 구간: {bands}")
+        for world, channels in summary['world_bands'].items():
+            for ch, bands in channels.items():
+                print(f"{world} {ch} 구간: {bands}")
@@ -0,0 +1,250 @@
+# --- 사전 컴파일된 문항 은행 ---
+# questions.json / descriptions.json 을 검증한 뒤 하나의 불변 바이너리 파일로 컴파일합니다.
+# 워커는 이 파일을 mmap 으로 열어 복사 없이 공유합니다 (유형 코드는 정수로 intern, 유형별 문항 목록은 배열,
+# 문자열은 오프셋 테이블 + UTF-8 블롭).
+#
+# 컴파일:  python question_bank.py [--questions questions.json] [--descriptions descriptions.json] [--out question_bank.bin]
+#
+# 파일 구조 (리틀 엔디언, 각 구역은 4바이트 정렬):
+#   헤더        magic 'RGBQ', version, 유형 수, 문항 수, 문자열 수, 유형별 색인 항목 수
+#   유형 코드    유형 수 × 3바이트 ASCII
+#   문항 id     문항 수 × uint32
+#   문항 유형    문항 수 × uint8 (유형 코드 번호)
+#   유형별 색인  (유형 수 + 1) × uint32 오프셋, 항목 수 × uint32 문항 행 번호
+#   문자열      (문자열 수 + 1) × uint32 오프셋, UTF-8 블롭
+#               문자열 0..문항 수-1 은 문항 텍스트, 이후는 설명 블록 (구역 × R/G/B × 10구간 순서)
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from scoring import BAND_COUNT, DESCRIPTION_SECTIONS, TYPE_CODES, description_id
+
+MAGIC = b'RGBQ'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIII')
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BANK_PATH = os.path.join(current_dir, 'question_bank.bin')
+
+
+# --- 검증 ---
+def validate_bank(questions_data, description_blocks):
+    """문항/설명 데이터를 검증합니다. 문제가 있으면 모든 문제를 모아 ValueError 를 발생시킵니다."""
+    errors = []
+    questions = questions_data.get('questions') if isinstance(questions_data, dict) else None
+    if not isinstance(questions, list):
+        errors.append("questions.json 에 'questions' 목록이 없습니다.")
+        questions = []
+
+    seen_ids = set()
+    for position, q in enumerate(questions):
+        if not isinstance(q, dict):
+            errors.append(f"문항 #{position}: 객체가 아닙니다."); continue
+        q_id = q.get('id')
+        if not isinstance(q_id, int) or isinstance(q_id, bool) or q_id < 0:
+            errors.append(f"문항 #{position}: id 가 0 이상의 정수가 아닙니다 ({q_id!r}).")
+        elif q_id in seen_ids:
+            errors.append(f"문항 #{position}: 중복 id {q_id}.")
+        else:
+            seen_ids.add(q_id)
+        if q.get('type') not in TYPE_CODES:
+            errors.append(f"문항 id {q_id}: 알 수 없는 유형 {q.get('type')!r} (RGB×PS×ias 18개 중 하나여야 함).")
+        if not isinstance(q.get('text'), str) or not q.get('text'):
+            errors.append(f"문항 id {q_id}: text 가 비어 있거나 문자열이 아닙니다.")
+
+    for section in DESCRIPTION_SECTIONS:
+        blocks = description_blocks.get(section) if isinstance(description_blocks, dict) else None
+        if not isinstance(blocks, dict):
+            errors.append(f"descriptions.json 에 '{section}' 구역이 없습니다."); continue
+        for k in "RGB":
+            bands = blocks.get(k)
+            if not isinstance(bands, list) or len(bands) != BAND_COUNT:
+                errors.append(f"{section}.{k}: 길이 {BAND_COUNT} 의 배열이어야 합니다.")
+            elif not all(isinstance(text, str) for text in bands):
+                errors.append(f"{section}.{k}: 모든 구간 설명은 문자열이어야 합니다.")
+
+    if errors:
+        raise ValueError("문항 은행 검증 실패:\n" + "\n".join(errors))
+
+
+# --- 컴파일 ---
+def _pad4(buffer):
+    buffer.extend(b'\0' * (-len(buffer) % 4))
+
+
+def _le(values):
+    # array 는 플랫폼 바이트 순서를 따르므로 파일은 항상 리틀 엔디언으로 맞춥니다.
+    if sys.byteorder != 'little': values.byteswap()
+    return values.tobytes()
+
+
+def compile_bank(questions_data, description_blocks):
+    """검증 후 바이너리 문항 은행 bytes 를 만듭니다."""
+    validate_bank(questions_data, description_blocks)
+    questions = questions_data['questions']
+
+    type_index = {code: i for i, code in enumerate(TYPE_CODES)}
+    rows_by_type = [[] for _ in TYPE_CODES]
+    for row, q in enumerate(questions):
+        rows_by_type[type_index[q['type']]].append(row)
+
+    strings = [q['text'] for q in questions]
+    strings += [description_blocks[section][k][band] for section in DESCRIPTION_SECTIONS for k in "RGB" for band in range(BAND_COUNT)]
+    encoded = [text.encode('utf-8') for text in strings]
+    string_offsets = array('I', [0])
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+
+    index_offsets = array('I', [0])
+    for rows in rows_by_type:
+        index_offsets.append(index_offsets[-1] + len(rows))
+
+    out = bytearray(HEADER.pack(MAGIC, VERSION, len(TYPE_CODES), len(questions), len(strings), index_offsets[-1]))
+    out += ''.join(TYPE_CODES).encode('ascii'); _pad4(out)
+    out += _le(array('I', [q['id'] for q in questions]))
+    out += bytes(type_index[q['type']] for q in questions); _pad4(out)
+    out += _le(index_offsets)
+    out += _le(array('I', [row for rows in rows_by_type for row in rows]))
+    out += _le(string_offsets)
+    out += b''.join(encoded)
+    return bytes(out)
+
+
+def compile_bank_file(questions_path, descriptions_path, out_path=DEFAULT_BANK_PATH):
+    with open(questions_path, 'r', encoding='utf-8') as f: questions_data = json.load(f)
+    with open(descriptions_path, 'r', encoding='utf-8') as f: description_blocks = json.load(f)
+    data = compile_bank(questions_data, description_blocks)
+    # 다른 워커가 읽는 중일 수 있으므로 임시 파일에 쓴 뒤 교체합니다.
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f: f.write(data)
+    os.replace(tmp_path, out_path)
+    return len(data)
+
+
+# --- 로드 ---
+class QuestionBank:
+    """컴파일된 문항 은행의 읽기 전용 뷰. mmap(또는 bytes) 위의 memoryview 만 들고 있어 복사가 없습니다."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, version, n_types, n_questions, n_strings, n_entries = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("문항 은행 파일 형식이 맞지 않습니다 (magic/version).")
+
+        pos = HEADER.size
+        codes = bytes(view[pos:pos + 3 * n_types]).decode('ascii')
+        self.type_codes = tuple(codes[i * 3:i * 3 + 3] for i in range(n_types))
+        # 유형 번호를 scoring.TYPE_CODES 의 인덱스로 바로 쓰므로 순서가 같아야 합니다.
+        if self.type_codes != tuple(TYPE_CODES):
+            raise ValueError("문항 은행의 유형 코드 순서가 scoring.TYPE_CODES 와 다릅니다. 다시 컴파일하세요.")
+        pos += 3 * n_types; pos += -pos % 4
+
+        def take(count, fmt, size):
+            nonlocal pos
+            part = view[pos:pos + count * size]
+            pos += count * size; pos += -pos % 4
+            if sys.byteorder != 'little' and size > 1:
+                values = array(fmt); values.frombytes(part); values.byteswap()
+                return memoryview(values)
+            return part.cast(fmt)
+
+        self.question_ids = take(n_questions, 'I', 4)
+        self.question_types = take(n_questions, 'B', 1)
+        self._index_offsets = take(n_types + 1, 'I', 4)
+        self._index_entries = take(n_entries, 'I', 4)
+        self._string_offsets = take(n_strings + 1, 'I', 4)
+        self._blob = view[pos:]
+        self.question_count = n_questions
+        self._type_numbers = {code: i for i, code in enumerate(self.type_codes)}
+
+    def string(self, number):
+        return bytes(self._blob[self._string_offsets[number]:self._string_offsets[number + 1]]).decode('utf-8')
+
+    def question_text(self, row):
+        return self.string(row)
+
+    def question_type(self, row):
+        return self.type_codes[self.question_types[row]]
+
+    def question(self, row):
+        """문항 행 번호 → {'id', 'type', 'text'} dict (questions.json 과 같은 형태)."""
+        return {'id': self.question_ids[row], 'type': self.question_type(row), 'text': self.question_text(row)}
+
+    def type_rows(self, type_code):
+        """유형 코드에 속한 문항 행 번호 배열 (원본 순서, 복사 없는 memoryview)."""
+        number = self._type_numbers[type_code]
+        return self._index_entries[self._index_offsets[number]:self._index_offsets[number + 1]]
+
+    def description(self, section, channel, band):
+        return self.string(self.question_count + description_id(section, channel, band))
+
+    def description_table(self):
+        """설명 ID(scoring.description_id) 순서의 설명 튜플. scoring.build_results 에 그대로 넘깁니다."""
+        return tuple(self.string(self.question_count + number) for number in range(len(DESCRIPTION_SECTIONS) * 3 * BAND_COUNT))
+
+    def to_questions_data(self):
+        """questions.json 과 같은 구조로 되돌립니다 (기존 코드 호환용)."""
+        return {'questions': [self.question(row) for row in range(self.question_count)]}
+
+    def to_description_blocks(self):
+        """descriptions.json 과 같은 구조로 되돌립니다 (기존 코드 호환용)."""
+        return {section: {k: [self.description(section, k, band) for band in range(BAND_COUNT)] for k in "RGB"}
+                for section in DESCRIPTION_SECTIONS}
+
+
+def bank_from_json(questions_data, description_blocks):
+    """JSON 데이터를 메모리에서 컴파일해 QuestionBank 로 엽니다 (컴파일된 파일이 없을 때)."""
+    return QuestionBank(compile_bank(questions_data, description_blocks))
+
+
+def load_bank(path=DEFAULT_BANK_PATH):
+    """문항 은행 파일을 읽기 전용 mmap 으로 엽니다. 같은 파일을 여는 프로세스들은 페이지 캐시를 공유합니다."""
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return QuestionBank(buffer)
+
+
+def open_bank(path=DEFAULT_BANK_PATH):
+    """컴파일된 파일이 있으면 mmap 으로 열고, 없으면 기본 JSON 파일을 메모리에서 컴파일합니다."""
+    if os.path.exists(path):
+        return load_bank(path)
+    with open(os.path.join(current_dir, 'questions.json'), 'r', encoding='utf-8') as f: questions_data = json.load(f)
+    with open(os.path.join(current_dir, 'descriptions.json'), 'r', encoding='utf-8') as f: description_blocks = json.load(f)
+    return bank_from_json(questions_data, description_blocks)
+
+
+# --- 세계별 균형 문항 목록 ---
+def balanced_question_rows(bank):
+    """세계(i/a/s)별로 P/S 문항 수를 채널마다 같게 맞춘 문항 행 번호 튜플을 반환합니다.
+
+    순서는 RP, RS, GP, GS, BP, BS (각 유형 내 원본 순서)이며 섞지 않습니다.
+    세션별 무작위 순서는 이 튜플의 순열로 만듭니다.
+    """
+    question_rows = {}
+    for world in ['i', 'a', 's']:
+        world_rows = []
+        for main in "RGB":
+            p_rows, s_rows = bank.type_rows(f'{main}P{world}'), bank.type_rows(f'{main}S{world}')
+            count = min(len(p_rows), len(s_rows))
+            world_rows.extend(p_rows[:count].tolist() + s_rows[:count].tolist())
+        question_rows[world] = tuple(world_rows)
+    return question_rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="문항 은행을 검증하고 바이너리 파일로 컴파일합니다.")
+    parser.add_argument('--questions', default=os.path.join(current_dir, 'questions.json'))
+    parser.add_argument('--descriptions', default=os.path.join(current_dir, 'descriptions.json'))
+    parser.add_argument('--out', default=DEFAULT_BANK_PATH)
+    args = parser.parse_args()
+
+    try:
+        size = compile_bank_file(args.questions, args.descriptions, args.out)
+    except ValueError as e:
+        sys.exit(str(e))
+    print(f"{args.out} ({size} bytes)")
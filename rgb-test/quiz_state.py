@@ -0,0 +1,51 @@
+# --- 퀴즈 진행 상태 ---
+# 세션 상태(st.session_state 또는 일반 dict)에 문항 순서, 다음 문항 커서, 18개 유형 점수를 두고
+# 답변마다 상수 시간으로 갱신합니다. 결과 단계는 다시 집계하지 않고 누적 점수를 그대로 읽습니다.
+import random
+
+from scoring import TYPE_CODES, WORLDS
+
+
+def init_quiz_state(state, question_rows, rng=random):
+    """세션별 문항 순서(행 번호 순열)와 커서/누적 점수를 한 번만 초기화합니다."""
+    if 'question_sequence' in state:
+        return
+    sequence, bounds = [], {}
+    for world in WORLDS:
+        rows = list(question_rows.get(world, ()))
+        rng.shuffle(rows)
+        bounds[world] = (len(sequence), len(sequence) + len(rows))
+        sequence.extend(rows)
+    state['question_sequence'] = sequence
+    state['world_bounds'] = bounds
+    state['cursor'] = 0
+    state['type_scores'] = [0] * len(TYPE_CODES)
+    if 'responses' not in state: state['responses'] = {}
+
+
+def current_question(state, world):
+    """해당 세계에서 아직 답하지 않은 다음 문항의 (전체 순서상 위치, 행 번호). 세계를 다 풀었으면 None."""
+    start, end = state['world_bounds'][world]
+    position = max(state['cursor'], start)
+    if position >= end:
+        return None
+    return position, state['question_sequence'][position]
+
+
+def record_answer(state, bank, position, row, value):
+    """답변을 기록하고 해당 유형 점수만 갱신합니다. 이미 답한 문항(중복 클릭)은 이전 값을 빼고 덮어씁니다."""
+    q_id = bank.question_ids[row]
+    # 컴파일된 문항 은행의 유형 번호는 TYPE_CODES 순서와 같습니다.
+    type_number = bank.question_types[row]
+    previous = state['responses'].get(q_id)
+    if previous is None:
+        state['cursor'] = max(state['cursor'], position + 1)
+    else:
+        state['type_scores'][type_number] -= previous
+    state['type_scores'][type_number] += value
+    state['responses'][q_id] = value
+
+
+def type_score_dict(state):
+    """누적 점수를 scoring.build_results 가 받는 {유형 코드: 점수} dict 로 반환합니다."""
+    return dict(zip(TYPE_CODES, state['type_scores']))
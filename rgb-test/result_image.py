@@ -0,0 +1,348 @@
+# --- 결과 이미지 렌더링 ---
+# PIL 만으로 종합 결과 PNG 를 그립니다. Streamlit 없이 import 할 수 있어 배치 작업에서도 사용합니다.
+import io
+import threading
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw
+
+from app_metrics import metrics
+from font_registry import get_result_fonts, measure_text
+
+# --- 텍스트 길이 측정 도우미 함수 (안정성 강화) ---
+def safe_text_width(draw_obj, text, font):
+    """PIL의 textlength 대신 textbbox를 사용하여 텍스트 너비를 안전하게 측정합니다."""
+    if not text:
+        return 0
+    try:
+        bbox = draw_obj.textbbox((0, 0), text, font=font)
+        return bbox[2] - bbox[0]
+    except Exception:
+        return len(text) * font.size
+
+
+def text_segment_width(font, segment):
+    """줄바꿈 문자가 없는 한 줄 텍스트의 너비. 측정 실패 시 safe_text_width 와 같은 근사값을 씁니다."""
+    if not segment:
+        return 0
+    try:
+        return measure_text(font, segment)
+    except Exception:
+        return len(segment) * font.size
+
+
+# --- 줄바꿈 계산 (메모이제이션) ---
+# 설명 문구는 descriptions.json 의 고정 집합이므로 (텍스트, 폰트, 너비, 모드)별 결과를 재사용합니다.
+_wrap_cache = {}
+_wrap_cache_lock = threading.Lock()
+WRAP_CACHE_MAX_ENTRIES = 4096
+
+
+def font_cache_key(font):
+    path = getattr(font, 'path', None)
+    return (path if isinstance(path, str) else type(font).__name__, getattr(font, 'size', 0))
+
+
+def _wrap_words(text, font, width_limit):
+    # 종합 분석: 단어 단위 줄바꿈.
+    # 기존 방식(버퍼 전체를 textbbox 로 다시 측정)과 같은 판정을 하되, 단어 너비만 한 번씩 측정해 누적합니다.
+    # 단어 안의 '\n' 은 여러 줄 텍스트로 그려지므로, 가장 넓은 물리적 줄 너비(widest)를 기준으로 판정합니다.
+    lines = []
+    line_buffer = ""
+    widest = 0
+    current = 0
+
+    for word in text.split(' '):
+        segment_widths = [text_segment_width(font, segment) for segment in (word + ' ').split('\n')]
+        if len(segment_widths) == 1:
+            next_current = current + segment_widths[0]
+            next_widest = max(widest, next_current)
+        else:
+            next_current = segment_widths[-1]
+            next_widest = max([widest, current + segment_widths[0]] + segment_widths[1:])
+
+        if next_widest < width_limit:
+            line_buffer += word + " "
+            widest, current = next_widest, next_current
+        else:
+            lines.append(line_buffer)
+            line_buffer = word + " "
+            widest, current = max(segment_widths), segment_widths[-1]
+    lines.append(line_buffer.strip())
+    return lines
+
+
+def _wrap_chars(text, font, width_limit):
+    # 세계별 분석: 문자열 길이 기반 강제 줄바꿈 (잘림 방지 보강)
+    chars_per_line = int(width_limit / (font.size * 0.55)) - 12
+    if chars_per_line < 10: chars_per_line = 10
+    return [text[i:i + chars_per_line] for i in range(0, len(text), chars_per_line)]
+
+
+def wrap_description(text, font, width_limit, is_world_section=False):
+    """설명 문구를 줄 단위 튜플로 나눕니다. 결과는 프로세스 내에서 메모이제이션됩니다."""
+    key = (text, font_cache_key(font), width_limit, is_world_section)
+    lines = _wrap_cache.get(key)
+    if lines is None:
+        lines = tuple(_wrap_chars(text, font, width_limit) if is_world_section else _wrap_words(text, font, width_limit))
+        with _wrap_cache_lock:
+            if len(_wrap_cache) >= WRAP_CACHE_MAX_ENTRIES: _wrap_cache.clear()
+            _wrap_cache[key] = lines
+    return lines
+
+
+# --- 레이아웃 단계 ---
+# 그리기 명령을 ('text', 좌표, 문자열, 폰트, 색, anchor) / ('rect', 좌표, 채움색, 테두리색, 두께) 로 모읍니다.
+# 높이 계산과 실제 그리기가 같은 목록을 쓰므로 줄바꿈은 블록마다 한 번만 수행됩니다.
+TITLE_COLORS = {'R': '#E63946', 'G': '#7FB069', 'B': '#457B9D',
+                'default_r': '#E63946', 'default_g': '#7FB069', 'default_b': '#457B9D'}
+
+
+def layout_description_block(ops, title_text, description, color_code, y_start, x_start, width_limit, title_font_obj, text_font_obj, is_world_section=False, description_id=None):
+    """설명 블록 하나의 그리기 명령을 ops 에 추가하고, 블록 다음 y 좌표를 반환합니다.
+    description_id(scoring.description_id)는 아틀라스 배치 함수용이며 여기서는 쓰지 않습니다."""
+    current_y_local = y_start
+
+    ops.append(('text', (x_start, current_y_local), title_text, title_font_obj, TITLE_COLORS.get(color_code, '#333333'), None))
+    # 제목 아래 간격을 0px으로 설정하여 최소화
+    current_y_local += title_font_obj.size + 0
+
+    # 종합 분석 섹션일 경우에만 문단 앞 추가 간격 (요청 반영)
+    if not is_world_section:
+        current_y_local += 20
+
+    # 줄 간격 추가 확보: 종합 25px, 세계별 10px
+    line_spacing = 10 if is_world_section else 25
+    for line in wrap_description(description, text_font_obj, width_limit, is_world_section):
+        ops.append(('text', (x_start, current_y_local), line, text_font_obj, "#555555", None))
+        current_y_local += text_font_obj.size + line_spacing
+
+    # 문단 간격 조정: 종합 50px, 세계별 60px
+    paragraph_spacing_after_block = 60 if is_world_section else 50
+    current_y_local += paragraph_spacing_after_block
+    return current_y_local
+
+
+# 설명 블록 제목 (색상 코드 포함)
+COMPREHENSIVE_BLOCK_TITLES = {'R': ("진취형(R) 성향 분석", 'R'), 'G': ("중재형(G) 성향 분석", 'G'), 'B': ("신중형(B) 성향 분석", 'B')}
+WORLD_BLOCK_TITLES = {'R': ("추진력/결정/리더십", 'default_r'), 'G': ("인간관계/협력/의사소통", 'default_g'), 'B': ("사고방식/계획/판단", 'default_b')}
+
+
+def column_geometry(img_width=1200, padding_x=20):
+    """하단 2단 배치의 (왼쪽 x, 왼쪽 너비, 오른쪽 x, 오른쪽 너비)."""
+    left_x_start = padding_x
+    left_section_width = (img_width / 2 - (1.5 * padding_x)) - left_x_start
+    right_x_start = img_width / 2 + padding_x
+    right_section_width = (img_width - padding_x) - right_x_start
+    return left_x_start, left_section_width, right_x_start, right_section_width
+
+
+def layout_result_image(comprehensive_result, world_results, fonts, img_width=1200, padding_x=20, layout_block=layout_description_block):
+    """결과 이미지 전체의 그리기 명령 목록과 최종 높이를 계산합니다.
+
+    layout_block 은 설명 블록 하나를 배치하는 함수로, 기본값은 텍스트를 줄바꿈해 그리는 layout_description_block 입니다.
+    (sprite_atlas 는 미리 렌더링한 타일을 배치하는 함수를 넘깁니다.)
+    """
+    title_font, section_title_font, sub_section_title_font, text_font_bold, text_font, hex_font = fonts
+    ops = []
+
+    y_cursor = 60
+
+    # 1. 제목 "당신의 종합 분석 결과"
+    ops.append(('text', (padding_x, y_cursor), "당신의 종합 분석 결과", title_font, "#333333", None))
+    y_cursor += title_font.size + 30
+
+    # 2. 섹션 제목 (좌우)
+    ops.append(('text', (padding_x, y_cursor), "종합 성격 색상", section_title_font, "#333333", None))
+    ops.append(('text', (img_width / 2 + padding_x, y_cursor), "유형별 강도 시각화", section_title_font, "#333333", None))
+    y_cursor += section_title_font.size + 20
+
+    # --- 3. 왼쪽 상단: 종합 성격 색상 ---
+    hex_color = comprehensive_result['hex']
+    color_box_y_start = y_cursor
+    color_box_y_end = color_box_y_start + 150
+    color_box_x_end = img_width / 2 - (1.5 * padding_x)
+    ops.append(('rect', [padding_x, color_box_y_start, color_box_x_end, color_box_y_end], hex_color, "#CCCCCC", 1))
+    ops.append(('text', (padding_x + (color_box_x_end - padding_x) / 2, color_box_y_end + 10), hex_color, hex_font, "#333333", "mt"))
+
+    y_cursor_after_color_box = color_box_y_end + hex_font.size + 30
+
+    # --- 4. 오른쪽 상단: 퍼센티지 바 섹션 ---
+    percentages = comprehensive_result['percentages']
+
+    bar_y_start = y_cursor + 20
+    bar_x_start = img_width / 2 + padding_x
+
+    section_width = img_width - bar_x_start - padding_x
+    text_buffer_width = 80
+    bar_width = section_width - text_buffer_width
+
+    colors = {'R': '#E63946', 'G': '#7FB069', 'B': '#457B9D'}
+    labels = {'R': '진취형 (R)', 'G': '중재형 (G)', 'B': '신중형 (B)'}
+
+    for k in ['B', 'G', 'R']:
+        bar_height = 20
+        perc = percentages[k]
+
+        ops.append(('text', (bar_x_start, bar_y_start), labels[k], text_font_bold, "#333333", None))
+        ops.append(('text', (bar_x_start + bar_width + 10, bar_y_start), f"{perc}%", text_font_bold, "#333333", None))
+        ops.append(('rect', [bar_x_start, bar_y_start + 30, bar_x_start + bar_width, bar_y_start + 30 + bar_height], '#E0E0E0', "#CCCCCC", 1))
+
+        actual_bar_length = int(bar_width * (perc / 100))
+        ops.append(('rect', [bar_x_start, bar_y_start + 30, bar_x_start + actual_bar_length, bar_y_start + 30 + bar_height], colors[k], None, 1))
+
+        bar_y_start += (bar_height + 40)
+
+    y_cursor = max(y_cursor_after_color_box, bar_y_start + 20)
+
+    # --- 5. 상세 분석 & 세계별 분석 2단 배치 ---
+    left_x_start, left_section_width, right_x_start, right_section_width = column_geometry(img_width, padding_x)
+
+    # 5-1. 왼쪽: 상세 성격 분석
+    current_y_left = y_cursor
+    ops.append(('text', (left_x_start, current_y_left), "상세 성격 분석", section_title_font, "#333333", None))
+    current_y_left += section_title_font.size + 40
+
+    descriptions = comprehensive_result['descriptions']
+    description_ids = comprehensive_result.get('description_ids', {})
+    for k in "RGB":
+        title_text, color_code = COMPREHENSIVE_BLOCK_TITLES[k]
+        current_y_left = layout_block(ops, title_text, descriptions[k], color_code, current_y_left, left_x_start, left_section_width, text_font_bold, text_font,
+                                      description_id=description_ids.get(k))
+
+    # 5-2. 오른쪽: 세계별 요약 분석
+    current_y_right = y_cursor
+    ops.append(('text', (right_x_start, current_y_right), "세계별 요약 분석", section_title_font, "#333333", None))
+    current_y_right += section_title_font.size + 40
+
+    worlds_map = {'i': '내면 세계', 'a': '주변 세계', 's': '사회'}
+    for code, data in world_results.items():
+        ops.append(('text', (right_x_start, current_y_right), f"'{worlds_map[code]}'에서는...", sub_section_title_font, "#333333", None))
+        current_y_right += sub_section_title_font.size + 20
+
+        # 세계별 R, G, B 설명 (is_world_section=True)
+        for k in "RGB":
+            title_text, color_code = WORLD_BLOCK_TITLES[k]
+            current_y_right = layout_block(ops, title_text, data[f'description_{k}'], color_code, current_y_right, right_x_start, right_section_width, text_font_bold, text_font,
+                                           is_world_section=True, description_id=data.get('description_ids', {}).get(k))
+
+    final_img_height = int(max(current_y_left, current_y_right)) + 50
+    return ops, final_img_height
+
+
+# --- 인코더 프로필 ---
+# 모든 프로필은 색상 상자 픽셀이 comprehensive_result['hex'] 와 정확히 같아야 합니다 (검사 결과 자체이므로).
+# benchmarks.py --check-colors 로 확인하며, 색을 정확히 보존할 수 없는 JPEG 는 제공하지 않습니다.
+#   standard  무손실 RGB PNG, zlib 6 (기본값, PIL 기본 압축과 같음)
+#   fast      무손실 RGB PNG, zlib 1 (인코딩이 가장 빠르지만 standard 의 약 2배 크기, 서비스/대량 생성에서 선택)
+#   small     팔레트 PNG, optimize (가장 작은 PNG, 사용자 다운로드용 DOWNLOAD_ENCODER_PROFILE). 결과 이미지는 대부분 단색 + 안티앨리어싱 텍스트라
+#             256색으로 줄여도 눈으로 구분되지 않습니다. 사각형 채우기 색(색상 상자, 강도 막대)은 팔레트에
+#             정확한 값으로 고정하므로 근사되는 것은 글자 가장자리의 안티앨리어싱 색뿐입니다.
+#   archival  무손실 RGB PNG, zlib 9
+#   webp      무손실 WebP (PNG 가 필요 없는 클라이언트용)
+#   streamed  무손실 RGB PNG 를 띠 단위로 그리며 인코딩 (render_result_image 에서 strip_render 사용, 메모리 절약)
+ENCODER_PROFILES = {
+    'standard': {'format': 'PNG', 'palette': False, 'options': {'compress_level': 6}},
+    'fast': {'format': 'PNG', 'palette': False, 'options': {'compress_level': 1}},
+    'small': {'format': 'PNG', 'palette': True, 'options': {'optimize': True}},
+    'archival': {'format': 'PNG', 'palette': False, 'options': {'compress_level': 9}},
+    'webp': {'format': 'WEBP', 'palette': False, 'options': {'lossless': True, 'method': 4}},
+    'streamed': {'format': 'PNG', 'palette': False, 'strips': True, 'options': {'compress_level': 6}},
+}
+DEFAULT_ENCODER_PROFILE = 'standard'
+DOWNLOAD_ENCODER_PROFILE = 'small'
+IMAGE_FORMATS = {'PNG': ('image/png', '.png'), 'WEBP': ('image/webp', '.webp')}
+
+
+def encoder_profile(profile):
+    try:
+        return ENCODER_PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"알 수 없는 인코더 프로필: {profile} (가능: {', '.join(ENCODER_PROFILES)})")
+
+
+def image_format(profile=DEFAULT_ENCODER_PROFILE):
+    """프로필의 (MIME 타입, 파일 확장자)."""
+    return IMAGE_FORMATS[encoder_profile(profile)['format']]
+
+
+def exact_colors(ops):
+    """그리기 명령 중 사각형의 채우기/테두리 색. 팔레트 프로필에서도 정확히 보존할 색입니다."""
+    colors = set()
+    for op in ops:
+        if op[0] == 'rect':
+            colors.update(color for color in op[2:4] if color)
+    return sorted(colors)
+
+
+def _quantize_keeping(img, colors):
+    """img 를 256색 팔레트로 줄이되 colors 의 픽셀은 정확한 색의 팔레트 항목(뒤쪽 len(colors)개)을 쓰게 합니다."""
+    colors = [ImageColor.getrgb(color)[:3] for color in colors][:255]
+    size = 256 - len(colors)
+    quantized = img.quantize(size, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+    if not colors:
+        return quantized
+    palette = (quantized.getpalette() or [])[:size * 3]
+    palette += [0] * (size * 3 - len(palette))
+    for rgb in colors:
+        palette += rgb
+
+    # 픽셀을 RGBX 32비트 값으로 보고, 정렬한 고정 색 목록에서 이진 탐색으로 한 번에 찾습니다.
+    swatch = Image.new("RGB", (len(colors), 1))
+    swatch.putdata(colors)
+    targets = np.asarray(swatch.convert("RGBX")).view(np.uint32).ravel()
+    order = np.argsort(targets)
+    targets = targets[order]
+    pixels = np.asarray(img.convert("RGBX")).view(np.uint32).ravel()
+    slots = np.searchsorted(targets, pixels)
+    slots[slots == len(targets)] = 0
+    hit = targets[slots] == pixels
+    indices = np.array(quantized)
+    indices.reshape(-1)[hit] = size + order[slots[hit]]
+
+    result = Image.fromarray(indices, "P")
+    result.putpalette(palette)
+    return result
+
+
+def encode_image(img, profile=DEFAULT_ENCODER_PROFILE, keep_colors=()):
+    """RGB 이미지를 프로필에 맞게 인코딩한 bytes 를 반환합니다.
+    팔레트 프로필에서는 keep_colors(예: exact_colors(ops))의 색을 근사하지 않고 그대로 둡니다."""
+    settings = encoder_profile(profile)
+    buffer = io.BytesIO()
+    with metrics.span(f"{settings['format'].lower()}_encode"):
+        if settings['palette']:
+            img = _quantize_keeping(img, keep_colors)
+        img.save(buffer, format=settings['format'], **settings['options'])
+    return buffer.getvalue()
+
+
+def draw_ops(draw, ops, y_offset=0):
+    """레이아웃 단계에서 만든 그리기 명령('text', 'rect')을 실행합니다. 그 밖의 명령은 호출 측에서 처리합니다."""
+    for op in ops:
+        if op[0] == 'text':
+            _, (x, y), text, font, fill, anchor = op
+            draw.text((x, y - y_offset), text, font=font, fill=fill, anchor=anchor)
+        elif op[0] == 'rect':
+            _, (x0, y0, x1, y1), fill, outline, width = op
+            draw.rectangle([x0, y0 - y_offset, x1, y1 - y_offset], fill=fill, outline=outline, width=width)
+
+
+# --- 종합 결과 이미지 생성 함수 (겹침 및 잘림 문제 해결 반영) ---
+def generate_result_image(comprehensive_result, world_results, font_path, profile=DEFAULT_ENCODER_PROFILE):
+    # --- 1. 초기 설정 및 폰트 로드 ---
+    img_width = 1200  # 이미지 너비 유지
+    padding_x = 20    # 좌우 여백 유지
+
+    # 폰트는 프로세스 전역 레지스트리에서 공유합니다 (경로/크기별 1회 로드).
+    fonts = get_result_fonts(font_path)
+
+    # --- 2. 레이아웃 (줄바꿈/높이 계산은 한 번만) ---
+    ops, final_img_height = layout_result_image(comprehensive_result, world_results, fonts, img_width, padding_x)
+
+    # --- 3. 실제 이미지 생성 및 그리기 ---
+    img = Image.new("RGB", (img_width, final_img_height), color="#FFFFFF")
+    draw_ops(ImageDraw.Draw(img), ops)
+
+    # --- 4. 최종 이미지 인코딩 및 반환 ---
+    return encode_image(img, profile, exact_colors(ops))
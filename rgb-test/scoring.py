@@ -0,0 +1,157 @@
+# --- RGB 성격 검사 채점 엔진 ---
+# Streamlit, matplotlib, PIL 없이 import 가능한 순수 채점 함수 모음입니다.
+# streamlit_app.py 의 'results' 단계와 배치 작업/API 워커가 같은 공식을 공유합니다.
+import math
+
+# --- 기본 상수 ---
+WORLDS = ['i', 'a', 's']
+WORLD_TITLES = {'i': '내면 세계', 'a': '주변 세계', 's': '사회'}
+WORLD_KEYS = {'i': 'inner', 'a': 'relationships', 's': 'social'}
+TYPE_CODES = [f"{main}{sub}{world}" for main in "RGB" for sub in "PS" for world in "ias"]
+
+
+# --- 인덱스 계산 함수 ---
+def get_comprehensive_index(percentage):
+    if percentage <= 10: return 0
+    elif percentage <= 20: return 1
+    elif percentage <= 30: return 2
+    elif percentage <= 40: return 3
+    elif percentage <= 50: return 4
+    elif percentage <= 60: return 5
+    elif percentage <= 70: return 6
+    elif percentage <= 80: return 7
+    elif percentage <= 90: return 8
+    else: return 9
+
+def get_world_description_index(score, world_type):
+    if world_type == 'i':
+        index = math.floor((score + 48) / 9.7)
+    else:
+        index = math.floor((score + 40) / 8.1)
+    return min(max(index, 0), 9)
+
+
+# --- 유형별 점수 집계 ---
+def calculate_type_scores(responses, question_map):
+    """응답({문항 id: -4~4})을 18개 유형 코드별 점수 dict로 집계합니다."""
+    scores = {code: 0 for code in TYPE_CODES}
+    for q_id, value in responses.items():
+        q_type = question_map[q_id]['type']
+        if q_type in scores: scores[q_type] += value
+    return scores
+
+
+# --- 종합 결과 계산 ---
+def calculate_comprehensive(scores):
+    """유형별 점수에서 종합 RGB 값, 퍼센티지, HEX 코드, 구간 인덱스를 계산합니다."""
+    totals = {
+        k: (scores[f'{k}Pi'] + scores[f'{k}Pa'] + scores[f'{k}Ps']) - (scores[f'{k}Si'] + scores[f'{k}Sa'] + scores[f'{k}Ss'])
+        for k in "RGB"
+    }
+
+    # NOTE: 이전에 total_score_X * 2가 제거된 버전으로 유지됨
+    comp_final = {k: 128 + totals[k] for k in "RGB"}
+    comp_abs = {k: min(max(v, 0), 255) for k, v in comp_final.items()}
+    if all(type(v) is int for v in comp_abs.values()):
+        # 정수 0~255 값 → 퍼센티지/구간은 조회표 한 번으로 찾습니다 (아래 '구간/설명 조회표').
+        comp_perc = {k: COMPREHENSIVE_PERCENTAGE_TABLE[v] for k, v in comp_abs.items()}
+        comp_indices = {k: COMPREHENSIVE_BAND_TABLE[v] for k, v in comp_abs.items()}
+    else:
+        comp_perc = {k: round((v / 256.0) * 100, 1) for k, v in comp_abs.items()}
+        comp_indices = {k: get_comprehensive_index(p) for k, p in comp_perc.items()}
+    comp_hex = '#{:02X}{:02X}{:02X}'.format(int(comp_abs['R']), int(comp_abs['G']), int(comp_abs['B']))
+    return {'totals': totals, 'final': comp_final, 'values': comp_abs, 'percentages': comp_perc, 'hex': comp_hex, 'indices': comp_indices}
+
+
+# --- 세계별 결과 계산 ---
+def calculate_world_indices(scores):
+    """세계(i/a/s)별 R/G/B 점수 차이를 설명 구간 인덱스로 변환합니다."""
+    world_indices = {}
+    for code in WORLDS:
+        world_indices[code] = {
+            k: world_band(scores[f'{k}P{code}'] - scores[f'{k}S{code}'], code)
+            for k in "RGB"
+        }
+    return world_indices
+
+
+# --- 구간/설명 조회표 ---
+# 점수는 작은 정수 범위이므로 구간 인덱스와 설명 ID 를 미리 계산해 두고 배열 인덱스 한 번으로 찾습니다.
+# 조회표는 위 함수들로 만들므로 공식과 항상 같고, 범위를 벗어난 세계 점수는 양 끝 값(구간 0/9)과 같습니다.
+# 설명 ID = (구역 × 3 + 채널) × 10 + 구간 으로, 문항 은행 파일(question_bank)의 설명 순서와 같습니다.
+DESCRIPTION_SECTIONS = ['comprehensive', 'inner', 'relationships', 'social']
+BAND_COUNT = 10
+WORLD_SCORE_MIN, WORLD_SCORE_MAX = -128, 128
+
+
+def description_id(section, channel, band):
+    return (DESCRIPTION_SECTIONS.index(section) * 3 + "RGB".index(channel)) * BAND_COUNT + band
+
+
+WORLD_BAND_TABLE = {w: tuple(get_world_description_index(s, w) for s in range(WORLD_SCORE_MIN, WORLD_SCORE_MAX + 1)) for w in WORLDS}
+WORLD_DESCRIPTION_ID_TABLE = {w: {k: tuple(description_id(WORLD_KEYS[w], k, band) for band in WORLD_BAND_TABLE[w]) for k in "RGB"} for w in WORLDS}
+# 종합 값(128 + 합계를 0~255 로 자른 값)별 퍼센티지, 구간, 설명 ID
+COMPREHENSIVE_PERCENTAGE_TABLE = tuple(round((v / 256.0) * 100, 1) for v in range(256))
+COMPREHENSIVE_BAND_TABLE = tuple(get_comprehensive_index(p) for p in COMPREHENSIVE_PERCENTAGE_TABLE)
+COMPREHENSIVE_DESCRIPTION_ID_TABLE = {k: tuple(description_id('comprehensive', k, band) for band in COMPREHENSIVE_BAND_TABLE) for k in "RGB"}
+
+
+def _world_slot(score):
+    return min(max(score, WORLD_SCORE_MIN), WORLD_SCORE_MAX) - WORLD_SCORE_MIN
+
+
+def world_band(score, world):
+    """get_world_description_index 와 같은 값을 조회표에서 찾습니다 (정수가 아닌 점수는 공식으로 계산)."""
+    if type(score) is not int:
+        return get_world_description_index(score, world)
+    return WORLD_BAND_TABLE[world][_world_slot(score)]
+
+
+def flatten_descriptions(description_blocks):
+    """descriptions.json 구조를 설명 ID 순서의 튜플로 펼칩니다."""
+    return tuple(description_blocks[section][k][band] for section in DESCRIPTION_SECTIONS for k in "RGB" for band in range(BAND_COUNT))
+
+
+# --- 결과 조립 ---
+def build_results(scores, description_blocks):
+    """유형별 점수와 설명으로 화면/이미지에 쓰이는 결과 dict 두 개를 만듭니다.
+
+    description_blocks 는 설명 ID 순서의 튜플(flatten_descriptions, QuestionBank.description_table)이면
+    설명 ID 로 바로 찾고, descriptions.json 구조의 dict 이면 먼저 펼칩니다.
+    """
+    descriptions = flatten_descriptions(description_blocks) if isinstance(description_blocks, dict) else description_blocks
+    comp = calculate_comprehensive(scores)
+    if all(type(v) is int for v in comp['values'].values()):
+        comp_ids = {k: COMPREHENSIVE_DESCRIPTION_ID_TABLE[k][comp['values'][k]] for k in "RGB"}
+    else:
+        comp_ids = {k: description_id('comprehensive', k, comp['indices'][k]) for k in "RGB"}
+    comprehensive_result = {
+        'title': '종합', 'percentages': comp['percentages'], 'hex': comp['hex'], 'indices': comp['indices'],
+        'descriptions': {k: descriptions[comp_ids[k]] for k in "RGB"},
+        'description_ids': comp_ids,
+    }
+
+    world_results_data = {}
+    for code in WORLDS:
+        world_scores = {k: scores[f'{k}P{code}'] - scores[f'{k}S{code}'] for k in "RGB"}
+        if all(type(v) is int for v in world_scores.values()):
+            slots = {k: _world_slot(v) for k, v in world_scores.items()}
+            indices = {k: WORLD_BAND_TABLE[code][slots[k]] for k in "RGB"}
+            ids = {k: WORLD_DESCRIPTION_ID_TABLE[code][k][slots[k]] for k in "RGB"}
+        else:
+            indices = {k: get_world_description_index(v, code) for k, v in world_scores.items()}
+            ids = {k: description_id(WORLD_KEYS[code], k, indices[k]) for k in "RGB"}
+        world_results_data[code] = {
+            'title': WORLD_TITLES[code],
+            'indices': indices,
+            'description_R': descriptions[ids['R']],
+            'description_G': descriptions[ids['G']],
+            'description_B': descriptions[ids['B']],
+            'description_ids': ids,
+        }
+    return comprehensive_result, world_results_data
+
+
+def score_responses(responses, question_map, description_blocks):
+    """응답 → (종합 결과, 세계별 결과). 헤드리스 채점의 진입점입니다."""
+    return build_results(calculate_type_scores(responses, question_map), description_blocks)
@@ -0,0 +1,271 @@
+# --- 무상태 JSON/HTTP 채점·렌더링 서비스 ---
+# Streamlit UI 와 별도로, 자체 프런트엔드가 호출할 수 있는 asyncio HTTP 서버입니다 (표준 라이브러리만 사용).
+#
+#   GET  /questions[?seed=N]   세계별 균형 문항 세트 (get_balanced_questions_grouped 와 같은 구성, 요청마다 섞음)
+#   POST /score                {"responses": {"문항 id": -4~4, ...}} → 종합/세계별 결과 JSON
+#   POST /image[?profile=P]    같은 요청 → 결과 이미지 (기본 standard 무손실 PNG, ?profile=fast 는 더 빠르고 큼, result_image.ENCODER_PROFILES)
+#   GET  /healthz
+#
+# CPU 를 많이 쓰는 이미지 렌더링은 크기가 제한된 프로세스 풀에서 실행해 이벤트 루프가 막히지 않게 합니다.
+# 실행:  python scoring_service.py [--host 127.0.0.1] [--port 8080] [--workers N] [--max-pending M]
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from image_cache import ImageCache, result_signature, signature_key
+from question_bank import balanced_question_rows, open_bank
+from result_image import DEFAULT_ENCODER_PROFILE, ENCODER_PROFILES, image_format
+from scoring import WORLD_TITLES, WORLDS, score_responses
+
+logger = logging.getLogger(__name__)
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FONT_PATH = os.path.join(current_dir, 'NanumGothic.ttf')
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADER_LINES = 100  # 헤더 한 줄의 길이는 StreamReader 의 limit(기본 64KB)으로 제한됩니다.
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class RequestError(Exception):
+    """클라이언트에 그대로 돌려줄 HTTP 오류 (status, message)."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# --- 렌더링 워커 (프로세스 풀) ---
+def _init_render_worker(font_path):
+    # 워커마다 폰트/아틀라스를 미리 올려 첫 요청 지연을 줄입니다.
+    from font_registry import get_result_fonts
+    from sprite_atlas import load_sprite_atlas
+    get_result_fonts(font_path)
+    load_sprite_atlas()
+
+
+def _render_image(comprehensive_result, world_results, font_path, profile):
+    from sprite_atlas import render_result_image
+    return render_result_image(comprehensive_result, world_results, font_path, profile=profile)
+
+
+# --- 요청 처리 ---
+class ScoringService:
+    def __init__(self, bank, font_path=DEFAULT_FONT_PATH, workers=None, max_pending=None):
+        self.bank = bank
+        self.font_path = font_path
+        self.question_rows = balanced_question_rows(bank)
+        self.question_map = {q['id']: q for q in bank.to_questions_data()['questions']}
+        self.description_table = bank.description_table()
+        self.workers = workers or os.cpu_count() or 1
+        # 대기 중인 렌더링 수 상한. 넘으면 큐를 쌓지 않고 503 으로 바로 돌려보냅니다.
+        self.max_pending = max_pending or self.workers * 4
+        self.image_cache = ImageCache()
+        self._pool = None
+        self._render_slots = None
+
+    def start(self):
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_render_worker, initargs=(self.font_path,))
+        self._render_slots = asyncio.Semaphore(self.max_pending)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def questions(self, query):
+        """세계별 문항 목록. seed 가 있으면 같은 순서를 재현합니다."""
+        seed = query.get('seed', [None])[0]
+        rng = random.Random(seed)
+        worlds, number = {}, 1
+        for world in WORLDS:
+            rows = list(self.question_rows[world])
+            rng.shuffle(rows)
+            items = []
+            for row in rows:
+                items.append({'number': number, 'id': self.bank.question_ids[row], 'text': self.bank.question_text(row)})
+                number += 1
+            worlds[world] = {'title': WORLD_TITLES[world], 'questions': items}
+        return {'total': number - 1, 'worlds': worlds}
+
+    def parse_responses(self, body):
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            raise RequestError(400, "요청 본문이 올바른 JSON 이 아닙니다.")
+        raw = payload.get('responses') if isinstance(payload, dict) else None
+        if not isinstance(raw, dict):
+            raise RequestError(400, "'responses' 객체({문항 id: 점수})가 필요합니다.")
+        responses = {}
+        for key, value in raw.items():
+            try:
+                q_id = int(key)
+            except ValueError:
+                raise RequestError(400, f"문항 id 가 정수가 아닙니다: {key!r}")
+            if q_id not in self.question_map:
+                raise RequestError(400, f"알 수 없는 문항 id: {q_id}")
+            if not isinstance(value, int) or isinstance(value, bool) or not -4 <= value <= 4:
+                raise RequestError(400, f"문항 {q_id} 의 점수는 -4~4 정수여야 합니다.")
+            responses[q_id] = value
+        return responses
+
+    def score(self, body):
+        responses = self.parse_responses(body)
+        return score_responses(responses, self.question_map, self.description_table)
+
+    async def image(self, body, profile=DEFAULT_ENCODER_PROFILE):
+        if profile not in ENCODER_PROFILES:
+            raise RequestError(400, f"알 수 없는 인코더 프로필: {profile} (가능: {', '.join(ENCODER_PROFILES)})")
+        comprehensive_result, world_results = self.score(body)
+        key = signature_key(result_signature(comprehensive_result, world_results), profile, self.font_path)
+        data = self.image_cache.get(key, profile)
+        if data is not None:
+            return data
+        if self._render_slots.locked():
+            raise RequestError(503, "렌더링 대기열이 가득 찼습니다. 잠시 후 다시 시도하세요.")
+        async with self._render_slots:
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(self._pool, _render_image, comprehensive_result, world_results, self.font_path, profile)
+        self.image_cache.put(key, data, profile)
+        return data
+
+    async def dispatch(self, method, path, query, body):
+        """(status, content_type, bytes, 추가 헤더) 를 반환합니다."""
+        routes = {'/questions': 'GET', '/score': 'POST', '/image': 'POST', '/healthz': 'GET'}
+        if path not in routes:
+            raise RequestError(404, f"경로를 찾을 수 없습니다: {path}")
+        if method != routes[path]:
+            raise RequestError(405, f"{path} 는 {routes[path]} 만 지원합니다.")
+
+        if path == '/healthz':
+            return 200, 'application/json', b'{"status": "ok"}', {}
+        if path == '/questions':
+            return 200, 'application/json; charset=utf-8', _json_bytes(self.questions(query)), {}
+        if path == '/score':
+            comprehensive_result, world_results = self.score(body)
+            payload = {
+                'comprehensive': comprehensive_result,
+                'worlds': world_results,
+                'signature': signature_key(result_signature(comprehensive_result, world_results), font_path=self.font_path),
+            }
+            return 200, 'application/json; charset=utf-8', _json_bytes(payload), {}
+        profile = query.get('profile', [DEFAULT_ENCODER_PROFILE])[0]
+        data = await self.image(body, profile)
+        mime, extension = image_format(profile)
+        return 200, mime, data, {'Content-Disposition': f'inline; filename="RGB_personality_result{extension}"'}
+
+    async def handle_connection(self, reader, writer):
+        """HTTP/1.1 연결 하나를 처리합니다 (keep-alive 지원)."""
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except RequestError as e:
+                    await _write_response(writer, e.status, 'application/json; charset=utf-8', _json_bytes({'error': str(e)}), {}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                url = urlsplit(target)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                try:
+                    status, content_type, data, extra = await self.dispatch(method, url.path, parse_qs(url.query), body)
+                except RequestError as e:
+                    status, content_type, data, extra = e.status, 'application/json; charset=utf-8', _json_bytes({'error': str(e)}), {}
+                    if e.status == 503: extra = {'Retry-After': '1'}
+                except Exception:
+                    logger.exception("요청 처리 중 오류: %s %s", method, target)
+                    status, content_type, data, extra = 500, 'application/json; charset=utf-8', _json_bytes({'error': "내부 오류"}), {}
+                await _write_response(writer, status, content_type, data, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+# --- 최소 HTTP/1.1 파서 ---
+def _json_bytes(payload):
+    return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+
+async def _read_line(reader, status, message):
+    # 한 줄이 StreamReader 의 limit 를 넘으면 readline 이 ValueError(LimitOverrunError 변환)를 냅니다.
+    try:
+        return await reader.readline()
+    except (asyncio.LimitOverrunError, ValueError):
+        raise RequestError(status, message)
+
+
+async def _read_request(reader):
+    """(method, target, version, headers, body) 또는 연결 종료 시 None."""
+    request_line = await _read_line(reader, 400, "요청 줄이 너무 깁니다.")
+    if not request_line:
+        return None
+    try:
+        method, target, version = request_line.decode('latin-1').split()
+    except ValueError:
+        raise RequestError(400, "잘못된 요청 줄입니다.")
+    headers = {}
+    for count in range(MAX_HEADER_LINES + 1):
+        line = await _read_line(reader, 431, "헤더가 너무 깁니다.")
+        if line in (b'\r\n', b'\n', b''):
+            break
+        if count == MAX_HEADER_LINES:
+            raise RequestError(431, f"헤더는 {MAX_HEADER_LINES}개 이하여야 합니다.")
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise RequestError(400, "Content-Length 가 올바르지 않습니다.")
+    if length < 0:
+        raise RequestError(400, "Content-Length 가 올바르지 않습니다.")
+    if length > MAX_BODY_BYTES:
+        raise RequestError(413, f"요청 본문은 {MAX_BODY_BYTES} 바이트 이하여야 합니다.")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target, version.upper(), headers, body
+
+
+async def _write_response(writer, status, content_type, data, extra_headers, keep_alive):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+             f"Content-Type: {content_type}",
+             f"Content-Length: {len(data)}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines += [f"{name}: {value}" for name, value in extra_headers.items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + data)
+    await writer.drain()
+
+
+async def serve(host='127.0.0.1', port=8080, workers=None, max_pending=None, font_path=DEFAULT_FONT_PATH):
+    service = ScoringService(open_bank(), font_path, workers, max_pending)
+    service.start()
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    logger.info("scoring service on http://%s:%d (render workers=%d)", host, port, service.workers)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="RGB 성격 검사 채점/렌더링 HTTP 서비스")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None, help="렌더링 프로세스 수 (기본: CPU 수)")
+    parser.add_argument('--max-pending', type=int, default=None, help="동시에 대기할 수 있는 렌더링 수 (기본: workers × 4)")
+    parser.add_argument('--font', default=DEFAULT_FONT_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_pending, args.font))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,303 @@
+# --- 세션 진행 상태 저장소 ---
+# 퀴즈 진행 상태(단계, 문항 순서, 커서, 누적 점수, 응답)를 외부 저장소에 남겨 파드 재시작이나
+# 웹소켓 끊김 후에도 같은 세션 id 로 이어서 풀 수 있게 합니다. 완료한 검사도 기록으로 남습니다.
+#
+# 백엔드는 load / save_many 만 구현하면 됩니다.
+#   SQLiteBackend  로컬 파일 (기본값)
+#   RedisBackend   get/set(ex=)/delete 를 가진 Redis 호환 클라이언트 (redis-py 또는 LocalRedis)
+#
+# 답변 클릭 경로에서는 WriteBehindStore.update 가 답변 하나로 바뀐 값(answer_changes, 문항 수와 무관한 크기)만
+# 대기열에 넣고, 백그라운드 스레드가 세션별 전체 상태(저장소 소유 사본)에 합친 뒤 직렬화해 한 번에 기록합니다.
+# 전체 스냅샷 복사(session_snapshot, save)는 단계가 바뀔 때만 합니다.
+#
+# 설정: 환경 변수 RGB_SESSION_STORE = sqlite:///경로 | redis://호스트:포트/DB | memory
+import atexit
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SQLITE_PATH = os.path.join(current_dir, 'sessions.db')
+DEFAULT_FLUSH_INTERVAL = 0.5
+# 변경분을 합칠 세션별 전체 상태를 메모리에 둘 최대 세션 수 (넘으면 오래된 것부터 버리고 필요할 때 백엔드에서 읽습니다)
+MAX_CACHED_SESSIONS = 1024
+# 저장하는 세션 상태 키 (quiz_state.init_quiz_state 가 만드는 값 + 단계 + 적응형 검사 상태)
+PERSISTED_KEYS = ('stage', 'question_sequence', 'world_bounds', 'cursor', 'type_scores', 'responses', 'adaptive')
+
+
+# --- 스냅샷 ---
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def session_snapshot(state):
+    """세션 상태에서 저장할 값만 복사합니다 (이후 세션 상태가 바뀌어도 스냅샷은 그대로)."""
+    snapshot = {key: state[key] for key in PERSISTED_KEYS if key in state}
+    for key in ('question_sequence', 'type_scores'):
+        if key in snapshot: snapshot[key] = list(snapshot[key])
+    if 'world_bounds' in snapshot: snapshot['world_bounds'] = dict(snapshot['world_bounds'])
+    if 'responses' in snapshot: snapshot['responses'] = dict(snapshot['responses'])
+    if 'adaptive' in snapshot: snapshot['adaptive'] = copy.deepcopy(snapshot['adaptive'])
+    snapshot['completed'] = snapshot.get('stage') == 'results'
+    return snapshot
+
+
+def answer_changes(state, q_id):
+    """답변 하나(q_id)로 바뀌는 값만 복사합니다. 크기가 문항 수와 무관하므로 클릭 경로에서 씁니다."""
+    changes = {key: state[key] for key in ('stage', 'cursor') if key in state}
+    changes['type_scores'] = list(state['type_scores'])
+    changes['responses'] = {q_id: state['responses'][q_id]}
+    if 'adaptive' in state:
+        # 문항 순서(order)는 시작할 때 정해지므로 답변마다 바뀌는 카운터만 보냅니다.
+        adaptive = state['adaptive']
+        changes['adaptive'] = {'taken': dict(adaptive['taken']), 'stats': {key: list(v) for key, v in adaptive['stats'].items()}}
+    return changes
+
+
+def _merge_changes(target, changes):
+    # responses 와 adaptive 는 키 단위로 합치고 나머지는 덮어씁니다.
+    for key, value in changes.items():
+        if key in ('responses', 'adaptive') and key in target:
+            target[key].update(value)
+        else:
+            target[key] = copy.copy(value) if isinstance(value, dict) else value
+
+
+def restore_session(state, snapshot):
+    """저장된 스냅샷을 세션 상태에 되돌립니다 (복사본을 넣으므로 이후 세션 변경이 스냅샷에 번지지 않습니다).
+    init_quiz_state 는 이후 이미 초기화된 것으로 보고 건너뜁니다."""
+    for key in PERSISTED_KEYS:
+        if key in snapshot: state[key] = copy.deepcopy(snapshot[key])
+
+
+def _encode(snapshot):
+    return json.dumps(snapshot, ensure_ascii=False, separators=(',', ':'))
+
+
+def _decode(text):
+    snapshot = json.loads(text)
+    # JSON 객체 키는 문자열이므로 문항 id 를 다시 정수로 바꿉니다.
+    snapshot['responses'] = {int(q_id): value for q_id, value in snapshot.get('responses', {}).items()}
+    snapshot['world_bounds'] = {world: tuple(bounds) for world, bounds in snapshot.get('world_bounds', {}).items()}
+    return snapshot
+
+
+# --- 백엔드 ---
+class SQLiteBackend:
+    """sessions 테이블에 세션별 최신 스냅샷을 저장합니다. 완료 시각(completed_at)으로 완료 기록을 조회할 수 있습니다."""
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY, state TEXT NOT NULL, stage TEXT,"
+                " updated_at REAL NOT NULL, completed_at REAL)")
+
+    def load(self, session_id):
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return _decode(row[0]) if row else None
+
+    def save_many(self, snapshots):
+        now = time.time()
+        rows = [(sid, _encode(s), s.get('stage'), now, now if s.get('completed') else None) for sid, s in snapshots.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO sessions (session_id, state, stage, updated_at, completed_at) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(session_id) DO UPDATE SET state = excluded.state, stage = excluded.stage,"
+                " updated_at = excluded.updated_at, completed_at = COALESCE(sessions.completed_at, excluded.completed_at)",
+                rows)
+
+    def close(self):
+        with self._lock: self._conn.close()
+
+
+class RedisBackend:
+    """키 prefix + 세션 id 에 JSON 스냅샷을 저장합니다. 진행 중인 세션은 ttl(초) 후 만료, 완료된 세션은 유지합니다."""
+
+    def __init__(self, client, prefix='rgb:session:', ttl=7 * 24 * 3600):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def load(self, session_id):
+        data = self.client.get(self.prefix + session_id)
+        if data is None:
+            return None
+        return _decode(data.decode('utf-8') if isinstance(data, bytes) else data)
+
+    def save_many(self, snapshots):
+        # redis-py 는 파이프라인으로 왕복 한 번에 보내고, 파이프라인이 없는 클라이언트는 한 건씩 씁니다.
+        target = self.client.pipeline() if hasattr(self.client, 'pipeline') else self.client
+        for sid, snapshot in snapshots.items():
+            target.set(self.prefix + sid, _encode(snapshot), ex=None if snapshot.get('completed') else self.ttl)
+        if target is not self.client: target.execute()
+
+    def close(self):
+        pass
+
+
+class LocalRedis:
+    """RedisBackend 가 쓰는 get/set/delete 만 구현한 프로세스 내 대체품 (개발/테스트용)."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value, expires = self._data.get(key, (None, None))
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock: self._data[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    def delete(self, key):
+        with self._lock: return 1 if self._data.pop(key, None) is not None else 0
+
+
+# --- 비동기 write-behind ---
+class WriteBehindStore:
+    """save/update 는 대기열에 넣고 바로 반환합니다. 백그라운드 스레드가 flush_interval 마다 모아서 백엔드에 기록합니다.
+
+    대기열 항목은 세션별 [전체 스냅샷 또는 None, 그 뒤의 변경분] 입니다. flush 에서 전체 스냅샷이 없으면
+    저장소가 가진 세션 상태(없으면 백엔드에서 읽은 것)에 변경분을 합쳐 기록합니다."""
+
+    def __init__(self, backend, flush_interval=DEFAULT_FLUSH_INTERVAL, max_cached_sessions=MAX_CACHED_SESSIONS):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.max_cached_sessions = max_cached_sessions
+        self.batches_written = 0
+        self._pending = {}
+        self._states = OrderedDict()  # 세션 id → 마지막으로 기록한 전체 상태 (flush 스레드만 사용)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='session-write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def save(self, session_id, snapshot):
+        """전체 스냅샷(session_snapshot)을 대기열에 넣습니다. 같은 세션의 이전 항목은 덮어써서 한 번만 기록합니다."""
+        with self._lock: self._pending[session_id] = [snapshot, {}]
+        self._wakeup.set()
+
+    def update(self, session_id, changes):
+        """변경분(answer_changes)을 대기열의 같은 세션 항목에 합칩니다. 변경분 크기에만 비례합니다."""
+        with self._lock:
+            entry = self._pending.setdefault(session_id, [None, {}])
+            _merge_changes(entry[1], changes)
+        self._wakeup.set()
+
+    def load(self, session_id):
+        """대기 중인 항목을 먼저 기록한 뒤 백엔드에서 읽습니다 (호출 측과 공유하지 않는 새 객체)."""
+        with self._lock:
+            pending = session_id in self._pending
+        if pending: self.flush()
+        return self.backend.load(session_id)
+
+    def _materialize(self, session_id, base, changes):
+        # 저장소 소유의 전체 상태에 변경분을 합칩니다. flush 스레드(_flush_lock 안)에서만 호출됩니다.
+        state = base if base is not None else self._states.pop(session_id, None)
+        if state is None:
+            state = self.backend.load(session_id)
+            if state is None:
+                logger.warning("세션 %s 의 기준 상태가 없어 변경분을 버립니다.", session_id)
+                return None
+        _merge_changes(state, changes)
+        state['completed'] = state.get('stage') == 'results'
+        if not state['completed']:
+            self._states[session_id] = state
+            while len(self._states) > self.max_cached_sessions:
+                self._states.popitem(last=False)
+        return state
+
+    def flush(self):
+        """대기 중인 스냅샷/변경분을 지금 기록합니다."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return
+            snapshots = {}
+            for sid, (base, changes) in batch.items():
+                try:
+                    snapshot = self._materialize(sid, base, changes)
+                except Exception:
+                    logger.exception("세션 %s 상태를 읽지 못해 다음 주기에 다시 시도합니다.", sid)
+                    self._requeue(sid, base, changes)
+                    continue
+                if snapshot is not None: snapshots[sid] = snapshot
+            if not snapshots:
+                return
+            try:
+                self.backend.save_many(snapshots)
+                self.batches_written += 1
+            except Exception:
+                logger.exception("세션 %d건 저장 실패, 다음 주기에 다시 시도합니다.", len(snapshots))
+                for sid, snapshot in snapshots.items():
+                    self._states.pop(sid, None)
+                    self._requeue(sid, snapshot, {})
+
+    def _requeue(self, session_id, base, changes):
+        # 실패한 항목을 대기열에 되돌립니다. 그 사이 들어온 전체 스냅샷은 더 최신이므로 유지하고,
+        # 변경분만 있으면 실패한 항목 위에 그 변경분을 다시 얹습니다.
+        with self._lock:
+            entry = self._pending.get(session_id)
+            if entry is None:
+                self._pending[session_id] = [base, changes]
+            elif entry[0] is None:
+                merged = dict(changes)
+                _merge_changes(merged, entry[1])
+                self._pending[session_id] = [base, merged]
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait()
+            # 짧게 기다려 그 사이 들어온 저장 요청을 한 배치로 묶습니다.
+            time.sleep(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+        self.backend.close()
+
+
+def open_session_store(url=None):
+    """RGB_SESSION_STORE(또는 url) 설정에 맞는 WriteBehindStore 를 만듭니다."""
+    url = url or os.environ.get('RGB_SESSION_STORE') or f"sqlite:///{DEFAULT_SQLITE_PATH}"
+    if url == 'memory':
+        backend = RedisBackend(LocalRedis())
+    elif url.startswith('redis://') or url.startswith('rediss://'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Redis 저장소에는 redis 패키지가 필요합니다 (pip install redis).")
+        backend = RedisBackend(redis.Redis.from_url(url))
+    elif url.startswith('sqlite:///'):
+        backend = SQLiteBackend(url[len('sqlite:///'):])
+    else:
+        raise ValueError(f"지원하지 않는 세션 저장소 설정입니다: {url}")
+    return WriteBehindStore(backend)
@@ -0,0 +1,292 @@
+# --- 설명 블록 스프라이트 아틀라스 ---
+# descriptions.json 의 설명 블록(종합/세계별 × R/G/B × 10구간)은 고정 집합이므로,
+# 빌드 단계에서 generate_result_image 와 같은 크기로 한 번씩 래스터화해 아틀라스로 저장합니다.
+# 실행 시에는 타일을 붙여넣기만 하므로 요청 경로에서 설명 문구의 줄바꿈/텍스트 셰이핑이 없습니다.
+# 타일은 글자 커버리지(마스크)로 저장하고 draw.text 와 같은 순서·같은 블렌딩으로 붙이므로,
+# 제목과 본문 잉크가 겹치는 폰트에서도 직접 그린 이미지와 픽셀 단위로 같습니다.
+#
+# 아틀라스에는 빌드한 글꼴의 (경로, 크기, 수정 시각)을 기록하고, 다른 글꼴로 요청되면 저장된 문구로 다시 빌드합니다.
+#
+# 빌드:  python sprite_atlas.py [--font NanumGothic.ttf] [--out sprites]
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from PIL import Image, ImageDraw
+
+from font_registry import font_identity, get_result_fonts
+from result_image import (
+    COMPREHENSIVE_BLOCK_TITLES, DEFAULT_ENCODER_PROFILE, WORLD_BLOCK_TITLES, column_geometry, draw_ops,
+    encode_image, encoder_profile, exact_colors, generate_result_image, layout_description_block, layout_result_image,
+)
+from scoring import BAND_COUNT, DESCRIPTION_SECTIONS, WORLD_KEYS, flatten_descriptions
+
+ATLAS_VERSION = 4
+IMG_WIDTH = 1200
+PADDING_X = 20
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ATLAS_DIR = os.path.join(current_dir, 'sprites')
+
+logger = logging.getLogger(__name__)
+
+
+def block_key(description, is_world_section):
+    """블록 타일 조회 키. 같은 문구·같은 모드면 같은 타일을 씁니다."""
+    return hashlib.sha1(f"{int(is_world_section)}|{description}".encode('utf-8')).hexdigest()
+
+
+def title_key(title_text, is_world_section):
+    return f"{int(is_world_section)}|{title_text}"
+
+
+def _ink_extent(mask):
+    """커버리지가 있는 픽셀의 (오른쪽 끝, 아래쪽 끝). 없으면 (0, 0)."""
+    bbox = mask.getbbox()
+    return (bbox[2], bbox[3]) if bbox else (0, 0)
+
+
+def _coverage_tile(ops, size, y_offset=0):
+    """텍스트 명령을 검은 L 캔버스에 흰색(255)으로 그려 글자 커버리지 마스크를 만들고 잉크 범위로 자릅니다."""
+    tile = Image.new("L", size, 0)
+    draw_ops(ImageDraw.Draw(tile), [op[:4] + (255,) + op[5:] for op in ops], y_offset=y_offset)
+    right, bottom = _ink_extent(tile)
+    return tile.crop((0, 0, max(right, 1), max(bottom, 1)))
+
+
+# --- 빌드 단계 ---
+def _render_block(title_text, description, color_code, x_start, width_limit, fonts, is_world_section):
+    """블록 하나를 (제목 마스크, 본문 마스크, 메타데이터)로 래스터화합니다. 색은 메타데이터에 둡니다."""
+    text_font_bold, text_font = fonts[3], fonts[4]
+    ops = []
+    y_end = layout_description_block(ops, title_text, description, color_code, 0, 0, width_limit, text_font_bold, text_font, is_world_section)
+    title_op, body_ops = ops[0], ops[1:]
+    body_y = body_ops[0][1][1] if body_ops else y_end
+
+    # 텍스트는 x 방향으로 잘리지 않으므로 이미지 오른쪽 끝까지, 아래로는 여유를 두고 그린 뒤 잉크 범위로 자릅니다.
+    max_width = int(IMG_WIDTH - x_start)
+    slack = text_font.size * 20
+
+    title_tile = _coverage_tile([title_op], (max_width, text_font_bold.size * 3))
+    body_tile = _coverage_tile(body_ops, (max_width, int(y_end - body_y) + slack), y_offset=body_y)
+
+    meta = {'advance': y_end, 'body_y': body_y, 'color': body_ops[0][4] if body_ops else "#555555"}
+    return (title_tile, title_op[4]), body_tile, meta
+
+
+def build_sprite_atlas(description_blocks, font_path, out_dir=DEFAULT_ATLAS_DIR):
+    """모든 설명 블록을 래스터화해 out_dir 에 본문·제목 시트(body_atlas.<빌드>.png, title_atlas.<빌드>.png)와 atlas.json 을 씁니다."""
+    fonts = get_result_fonts(font_path)
+    left_x, left_width, right_x, right_width = column_geometry(IMG_WIDTH, PADDING_X)
+
+    sections = [('comprehensive', COMPREHENSIVE_BLOCK_TITLES, left_x, left_width, False)]
+    sections += [(WORLD_KEYS[code], WORLD_BLOCK_TITLES, right_x, right_width, True) for code in WORLD_KEYS]
+
+    titles, bodies, blocks = {}, {}, {}
+    for section, block_titles, x_start, width_limit, is_world_section in sections:
+        for k in "RGB":
+            title_text, color_code = block_titles[k]
+            for band, description in enumerate(description_blocks[section][k]):
+                key = block_key(description, is_world_section)
+                if key not in bodies:
+                    title_tile, body_tile, meta = _render_block(title_text, description, color_code, x_start, width_limit, fonts, is_world_section)
+                    titles.setdefault(title_key(title_text, is_world_section), title_tile)
+                    bodies[key] = (body_tile, meta)
+                blocks[f"{section}/{k}/{band}"] = key
+
+    def pack(tiles, mode, background):
+        # 타일을 세로로 쌓아 하나의 이미지로 만들고 (offset, width, height) 색인을 반환합니다.
+        index, offset = {}, 0
+        for key, tile in tiles.items():
+            index[key] = {'offset': offset, 'width': tile.width, 'height': tile.height}
+            offset += tile.height
+        sheet = Image.new(mode, (max((t.width for t in tiles.values()), default=1), max(offset, 1)), background)
+        for key, tile in tiles.items():
+            sheet.paste(tile, (0, index[key]['offset']))
+        return sheet, index
+
+    identity = list(font_identity(font_path))
+    descriptions = list(flatten_descriptions(description_blocks))
+    body_sheet, body_index = pack({k: tile for k, (tile, _) in bodies.items()}, "L", 0)
+    title_sheet, title_index = pack({k: tile for k, (tile, _) in titles.items()}, "L", 0)
+    for key, (_, meta) in bodies.items():
+        body_index[key].update(meta)
+    for key, (_, color) in titles.items():
+        title_index[key]['color'] = color
+
+    # 시트 파일 이름에 빌드 내용의 해시를 붙이고 atlas.json 을 마지막에 교체하므로,
+    # 다른 프로세스가 읽는 도중 다시 빌드해도 색인과 시트가 서로 다른 빌드로 섞이지 않습니다.
+    build = hashlib.sha1(repr((ATLAS_VERSION, identity, [font.size for font in fonts], descriptions)).encode('utf-8')).hexdigest()[:12]
+    sheets = {'body_sheet': f'body_atlas.{build}.png', 'title_sheet': f'title_atlas.{build}.png'}
+    os.makedirs(out_dir, exist_ok=True)
+    for name, sheet in (('body_sheet', body_sheet), ('title_sheet', title_sheet)):
+        tmp_path = os.path.join(out_dir, f'{sheets[name]}.{os.getpid()}.tmp')
+        sheet.save(tmp_path, format='PNG', optimize=True)
+        os.replace(tmp_path, os.path.join(out_dir, sheets[name]))
+    index = {
+        'version': ATLAS_VERSION,
+        'font': identity,
+        'font_sizes': [font.size for font in fonts],
+        'sheets': sheets,
+        'img_width': IMG_WIDTH,
+        'bodies': body_index,
+        'titles': title_index,
+        'blocks': blocks,
+        # 설명 ID(scoring.description_id) 순서의 문구. 실행 시 ID 로 찾은 타일이 같은 문구인지 확인합니다.
+        'descriptions': descriptions,
+    }
+    tmp_path = os.path.join(out_dir, f'atlas.json.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(out_dir, 'atlas.json'))
+    # 이전 빌드의 시트는 지웁니다 (지운 시트를 읽으려던 프로세스는 직접 렌더링으로 대체됩니다).
+    for path in glob.glob(os.path.join(out_dir, '*_atlas.*.png')):
+        if os.path.basename(path) not in sheets.values():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    return index
+
+
+def _description_blocks(descriptions):
+    """설명 ID 순서의 문구 목록(flatten_descriptions)을 descriptions.json 구조로 되돌립니다."""
+    texts = iter(descriptions)
+    return {section: {k: [next(texts) for _ in range(BAND_COUNT)] for k in "RGB"} for section in DESCRIPTION_SECTIONS}
+
+
+# --- 실행 단계 ---
+_atlases = {}
+_atlas_lock = threading.Lock()
+
+
+def load_sprite_atlas(atlas_dir=DEFAULT_ATLAS_DIR):
+    """아틀라스를 프로세스당 한 번 읽어 공유합니다. 없거나 버전이 맞지 않으면 None."""
+    if atlas_dir in _atlases:
+        return _atlases[atlas_dir]
+    with _atlas_lock:
+        if atlas_dir not in _atlases:
+            atlas = None
+            try:
+                with open(os.path.join(atlas_dir, 'atlas.json'), 'r', encoding='utf-8') as f: index = json.load(f)
+                if index.get('version') == ATLAS_VERSION:
+                    body_sheet = Image.open(os.path.join(atlas_dir, index['sheets']['body_sheet'])).convert("L")
+                    title_sheet = Image.open(os.path.join(atlas_dir, index['sheets']['title_sheet'])).convert("L")
+                    # 설명 ID → (문구, 본문 타일) 조회표. 결과의 description_ids 로 해시 계산 없이 찾습니다.
+                    keys = [index['blocks'][f"{section}/{k}/{band}"] for section in DESCRIPTION_SECTIONS for k in "RGB" for band in range(BAND_COUNT)]
+                    bodies_by_id = tuple((text, index['bodies'][key]) for text, key in zip(index['descriptions'], keys))
+                    atlas = {'index': index, 'body_sheet': body_sheet, 'title_sheet': title_sheet, 'bodies_by_id': bodies_by_id}
+            except (OSError, ValueError, KeyError):
+                atlas = None
+            _atlases[atlas_dir] = atlas
+    return _atlases[atlas_dir]
+
+
+def atlas_matches_font(atlas, font_path):
+    """아틀라스가 이 글꼴 파일(경로, 크기, 수정 시각)과 크기로 빌드되었는지 확인합니다."""
+    index = atlas['index']
+    return (index['font'] == list(font_identity(font_path))
+            and index['font_sizes'] == [font.size for font in get_result_fonts(font_path)])
+
+
+def rebuild_sprite_atlas(atlas_dir, font_path):
+    """저장된 문구로 font_path 글꼴의 아틀라스를 다시 빌드해 읽습니다. 빌드할 수 없으면 None."""
+    with _atlas_lock:
+        atlas = _atlases.get(atlas_dir)
+        if atlas is not None and atlas_matches_font(atlas, font_path):
+            return atlas
+        try:
+            descriptions = atlas['index']['descriptions']
+            build_sprite_atlas(_description_blocks(descriptions), font_path, atlas_dir)
+        except (OSError, TypeError, KeyError, StopIteration) as e:
+            logger.warning("스프라이트 아틀라스를 '%s' 글꼴로 다시 빌드하지 못해 직접 렌더링합니다: %s", font_path, e)
+            _atlases[atlas_dir] = None
+            return None
+        logger.info("글꼴이 달라 스프라이트 아틀라스를 다시 빌드했습니다: %s (%s)", atlas_dir, font_path)
+        _atlases.pop(atlas_dir, None)
+    return load_sprite_atlas(atlas_dir)
+
+
+def _paste_coverage(img, sheet, entry, x, y):
+    # draw.text 와 같은 방식(글자 색을 커버리지 마스크로 블렌딩)으로 붙이므로 먼저 그린 잉크와도 같게 합성됩니다.
+    box = (int(x), int(y), int(x) + entry['width'], int(y) + entry['height'])
+    box = (box[0], box[1], min(box[2], img.width), min(box[3], img.height))
+    if box[2] <= box[0] or box[3] <= box[1]:
+        return
+    mask = sheet.crop((0, entry['offset'], box[2] - box[0], entry['offset'] + box[3] - box[1]))
+    img.paste(entry['color'], box, mask)
+
+
+def generate_result_image_from_atlas(comprehensive_result, world_results, font_path, atlas, profile=DEFAULT_ENCODER_PROFILE):
+    """아틀라스 타일을 붙여 결과 이미지를 만듭니다. 다른 글꼴로 빌드되었거나 아틀라스에 없는 블록이 있으면 None."""
+    index = atlas['index']
+    if not atlas_matches_font(atlas, font_path):
+        return None
+    fonts = get_result_fonts(font_path)
+
+    missing = []
+
+    def place_block(ops, title_text, description, color_code, y_start, x_start, width_limit, title_font_obj, text_font_obj, is_world_section=False, description_id=None):
+        body = None
+        if description_id is not None and description_id < len(atlas['bodies_by_id']):
+            text, body = atlas['bodies_by_id'][description_id]
+            if text != description: body = None
+        # 설명 ID 가 없는 결과(이전 형식)나 아틀라스 빌드 이후 바뀐 문구는 문구 해시로 찾습니다.
+        if body is None:
+            body = index['bodies'].get(block_key(description, is_world_section))
+        title = index['titles'].get(title_key(title_text, is_world_section))
+        if body is None or title is None:
+            missing.append(description)
+            return y_start
+        ops.append(('tile', (x_start, y_start), 'title_sheet', title))
+        ops.append(('tile', (x_start, y_start + body['body_y']), 'body_sheet', body))
+        return y_start + body['advance']
+
+    ops, final_img_height = layout_result_image(comprehensive_result, world_results, fonts, IMG_WIDTH, PADDING_X, layout_block=place_block)
+    if missing:
+        return None
+
+    img = Image.new("RGB", (IMG_WIDTH, final_img_height), color="#FFFFFF")
+    draw = ImageDraw.Draw(img)
+    # 겹친 잉크의 합성 결과가 그리는 순서에 따라 달라지므로 직접 그릴 때와 같은 순서로 실행합니다.
+    for op in ops:
+        if op[0] == 'tile':
+            _, (x, y), sheet_name, entry = op
+            _paste_coverage(img, atlas[sheet_name], entry, x, y)
+        else:
+            draw_ops(draw, [op])
+
+    return encode_image(img, profile, exact_colors(ops))
+
+
+def render_result_image(comprehensive_result, world_results, font_path, atlas_dir=DEFAULT_ATLAS_DIR, profile=DEFAULT_ENCODER_PROFILE):
+    """아틀라스가 있으면 타일 합성으로, 없으면 generate_result_image 로 결과 이미지를 만듭니다 (profile 인코딩).
+    띠 단위 프로필('streamed')은 전체 캔버스를 만들지 않도록 strip_render 로 그립니다."""
+    settings = encoder_profile(profile)
+    if settings.get('strips'):
+        from strip_render import render_result_image_strips
+        return render_result_image_strips(comprehensive_result, world_results, font_path, compress_level=settings['options']['compress_level'])
+    atlas = load_sprite_atlas(atlas_dir)
+    if atlas is not None and not atlas_matches_font(atlas, font_path):
+        atlas = rebuild_sprite_atlas(atlas_dir, font_path)
+    if atlas is not None:
+        data = generate_result_image_from_atlas(comprehensive_result, world_results, font_path, atlas, profile)
+        if data is not None:
+            return data
+    return generate_result_image(comprehensive_result, world_results, font_path, profile)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="설명 블록 스프라이트 아틀라스를 빌드합니다.")
+    parser.add_argument('--font', default=os.path.join(current_dir, 'NanumGothic.ttf'))
+    parser.add_argument('--descriptions', default=os.path.join(current_dir, 'descriptions.json'))
+    parser.add_argument('--out', default=DEFAULT_ATLAS_DIR)
+    args = parser.parse_args()
+
+    with open(args.descriptions, 'r', encoding='utf-8') as f: description_blocks = json.load(f)
+    built = build_sprite_atlas(description_blocks, args.font, args.out)
+    print(f"블록 {len(built['blocks'])}개 (타일 {len(built['bodies'])}개) → {args.out}")
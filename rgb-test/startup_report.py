@@ -0,0 +1,116 @@
+# --- 시작 시간 리포트 ---
+# 앱 안에서는 무거운 모듈의 첫 import 시간과 단계별 첫 화면 출력 시점을 기록하고,
+# 단독 실행 시에는 모듈별 콜드 import 시간을 새 프로세스에서 측정합니다.
+# 첫 화면 시점은 인터프리터(프로세스) 시작 기준이므로 'streamlit run' 이 streamlit 을 import 하고 서버를 띄우는 시간도
+# 포함합니다 (script_start = 앱 스크립트가 처음 실행된 시점, 첫 브라우저 접속을 기다린 시간도 들어갑니다).
+# 리포트는 intro_i 첫 출력 시 stderr 에 'startup {...}' 한 줄로 남습니다 (app_metrics.configure_app_logging, RGB_LOG_LEVEL).
+#
+# 측정:  python startup_report.py [--json] [--repeat 3]
+import argparse
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _process_age():
+    """(인터프리터 시작 후 지난 초, 출처). /proc 또는 psutil 로 알 수 없으면 (None, None)."""
+    try:
+        with open('/proc/self/stat', 'r') as f: fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime', 'r') as f: uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK'), 'proc'  # 22번째 필드 starttime (부팅 후 클럭 틱)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return time.time() - psutil.Process().create_time(), 'psutil'
+    except Exception:
+        return None, None
+
+
+# 이 모듈이 처음 import 된 시점 = 프로세스에서 앱 스크립트가 처음 실행된 시점
+SCRIPT_START = time.perf_counter()
+# 인터프리터 시작 시점 (perf_counter 기준). 알 수 없으면 앱 스크립트 시작 시점으로 대신합니다.
+_age, PROCESS_START_SOURCE = _process_age()
+PROCESS_START = SCRIPT_START - max(_age, 0.0) if _age is not None else SCRIPT_START
+PROCESS_START_SOURCE = PROCESS_START_SOURCE or 'script'
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# 콜드 스타트 측정 대상 (앱이 쓰는 순서대로)
+COLD_START_MODULES = ['streamlit', 'scoring', 'intensity_chart', 'PIL.Image', 'result_image', 'image_cache', 'numpy', 'batch_scoring']
+
+_import_times = {}
+_first_paint = {}
+_lock = threading.Lock()
+
+
+def timed_import(module_name):
+    """모듈을 import 해 반환합니다. 이 프로세스에서 처음 로드되는 경우 걸린 시간을 기록합니다."""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    with _lock: _import_times.setdefault(module_name, time.perf_counter() - start)
+    return module
+
+
+def record_first_paint(stage):
+    """단계(stage)가 이 프로세스에서 처음 그려진 시점을 기록합니다. intro_i 첫 출력 시 리포트를 로그로 남깁니다."""
+    if stage in _first_paint:
+        return
+    with _lock:
+        if stage in _first_paint:
+            return
+        _first_paint[stage] = time.perf_counter() - PROCESS_START
+    if stage == 'intro_i':
+        logger.info("startup %s", json.dumps(get_startup_report(), ensure_ascii=False))
+
+
+def get_startup_report():
+    """{'process_start': 출처, 'script_start': 초, 'imports': {모듈: 초}, 'first_paint': {단계: 초}} 를 반환합니다.
+    script_start 와 first_paint 는 인터프리터 시작 후 초입니다."""
+    with _lock:
+        return {
+            'process_start': PROCESS_START_SOURCE,
+            'script_start': round(SCRIPT_START - PROCESS_START, 4),
+            'imports': {name: round(seconds, 4) for name, seconds in _import_times.items()},
+            'first_paint': {stage: round(seconds, 4) for stage, seconds in _first_paint.items()},
+        }
+
+
+def measure_cold_imports(modules=COLD_START_MODULES, repeat=3):
+    """모듈마다 새 파이썬 프로세스에서 import 시간을 재고 최솟값(초)을 반환합니다. 실패하면 None."""
+    code = "import time, importlib; t = time.perf_counter(); importlib.import_module({!r}); print(time.perf_counter() - t)"
+    results = {}
+    for name in modules:
+        samples = []
+        for _ in range(repeat):
+            proc = subprocess.run([sys.executable, '-c', code.format(name)], capture_output=True, text=True, cwd=current_dir)
+            if proc.returncode != 0:
+                samples = []
+                break
+            samples.append(float(proc.stdout.strip().splitlines()[-1]))
+        results[name] = min(samples) if samples else None
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="모듈별 콜드 import 시간을 측정합니다.")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help="결과를 JSON 으로 출력")
+    parser.add_argument('modules', nargs='*', default=COLD_START_MODULES)
+    args = parser.parse_args()
+
+    cold = measure_cold_imports(args.modules, args.repeat)
+    if args.json:
+        print(json.dumps(cold, ensure_ascii=False))
+    else:
+        for name, seconds in cold.items():
+            print(f"{name:<20} {'-' if seconds is None else f'{seconds * 1000:8.1f} ms'}")
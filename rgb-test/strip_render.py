@@ -0,0 +1,88 @@
+# --- 가로 띠(strip) 단위 스트리밍 렌더링 ---
+# 레이아웃(그리기 명령 + 전체 높이)은 한 번만 계산하고, 캔버스는 strip_height 높이의 띠 하나만 만들어
+# 띠마다 그린 뒤 PNG 행(IDAT)으로 압축해 출력 스트림에 바로 씁니다.
+# 렌더링 한 번의 최대 메모리가 전체 이미지 높이가 아니라 띠 높이에 비례하므로 (띠 캔버스 + 필터 버퍼 등
+# 띠 크기의 4배 안팎, 기본 256px 띠에서 약 4MB), 대량 생성/서비스처럼 여러 렌더링이 동시에 돌 때 유리합니다.
+# 선택: render_result_image(..., profile='streamed'), bulk_reports.py --profile streamed, POST /image?profile=streamed
+#
+# 출력은 무손실 RGB PNG 이며 generate_result_image(profile='archival') 와 픽셀이 같습니다.
+# (팔레트 프로필은 이미지 전체 색을 알아야 하므로 스트리밍 모드에서는 지원하지 않습니다.)
+import io
+import struct
+import zlib
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from app_metrics import metrics
+from font_registry import get_result_fonts
+from result_image import draw_ops, layout_result_image
+
+IMG_WIDTH = 1200
+PADDING_X = 20
+DEFAULT_STRIP_HEIGHT = 256
+DEFAULT_COMPRESS_LEVEL = 6
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _png_chunk(out, chunk_type, data):
+    out.write(struct.pack('>I', len(data)))
+    out.write(chunk_type)
+    out.write(data)
+    out.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type)) & 0xFFFFFFFF))
+
+
+def _op_extent(op):
+    """그리기 명령이 차지할 수 있는 세로 범위 (위, 아래). 텍스트는 글꼴 크기와 줄 수로 넉넉하게 잡습니다."""
+    if op[0] == 'rect':
+        _, (x0, y0, x1, y1), *_ = op
+        return y0, y1 + 1
+    _, (x, y), text, font, fill, anchor = op
+    size = getattr(font, 'size', 16)
+    # 설명 문장 안의 '\n' 은 draw.text 한 번에 여러 줄로 그려집니다.
+    return y - size, y + 2 * size * (text.count('\n') + 1)
+
+
+def _up_filter(rows, previous, out):
+    """PNG Up 필터(유형 2)를 out(행마다 필터 바이트 + 픽셀)에 씁니다. 각 행에서 바로 위 행을 빼며,
+    띠 경계에서는 이전 띠의 마지막 행(previous)을 씁니다. 빈 여백과 반복되는 행이 0 이 되어 잘 압축됩니다."""
+    n = rows.shape[0]
+    out[:n, 0] = 2
+    np.subtract(rows[0], previous, out=out[0, 1:])
+    np.subtract(rows[1:], rows[:-1], out=out[1:n, 1:])
+    return out[:n]
+
+
+def write_result_png_strips(comprehensive_result, world_results, font_path, out, strip_height=DEFAULT_STRIP_HEIGHT, compress_level=DEFAULT_COMPRESS_LEVEL):
+    """결과 이미지를 띠 단위로 그려 out(쓰기 가능한 바이너리 스트림)에 PNG 로 씁니다. (너비, 높이)를 반환합니다."""
+    fonts = get_result_fonts(font_path)
+    ops, height = layout_result_image(comprehensive_result, world_results, fonts, IMG_WIDTH, PADDING_X)
+    extents = [_op_extent(op) for op in ops]
+
+    out.write(PNG_SIGNATURE)
+    _png_chunk(out, b'IHDR', struct.pack('>IIBBBBB', IMG_WIDTH, height, 8, 2, 0, 0, 0))
+    compressor = zlib.compressobj(compress_level)
+    strip = Image.new("RGB", (IMG_WIDTH, strip_height), color="#FFFFFF")
+    draw = ImageDraw.Draw(strip)
+    previous = np.zeros(IMG_WIDTH * 3, dtype=np.uint8)
+    filtered = np.empty((strip_height, 1 + IMG_WIDTH * 3), dtype=np.uint8)
+    for top in range(0, height, strip_height):
+        rows = min(strip_height, height - top)
+        with metrics.span('strip_draw'):
+            draw.rectangle([0, 0, IMG_WIDTH, strip_height], fill="#FFFFFF")
+            draw_ops(draw, [op for op, (y0, y1) in zip(ops, extents) if y1 > top and y0 < top + rows], y_offset=top)
+        with metrics.span('strip_encode'):
+            pixels = np.asarray(strip, dtype=np.uint8).reshape(strip_height, IMG_WIDTH * 3)[:rows]
+            data = compressor.compress(_up_filter(pixels, previous, filtered))
+            previous[:] = pixels[-1]
+            if data: _png_chunk(out, b'IDAT', data)
+    _png_chunk(out, b'IDAT', compressor.flush())
+    _png_chunk(out, b'IEND', b'')
+    return IMG_WIDTH, height
+
+
+def render_result_image_strips(comprehensive_result, world_results, font_path, strip_height=DEFAULT_STRIP_HEIGHT, compress_level=DEFAULT_COMPRESS_LEVEL):
+    """write_result_png_strips 의 결과를 bytes 로 반환합니다."""
+    buffer = io.BytesIO()
+    write_result_png_strips(comprehensive_result, world_results, font_path, buffer, strip_height, compress_level)
+    return buffer.getvalue()
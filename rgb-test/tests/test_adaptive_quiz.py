@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from conftest import APP_DIR
+
+
+@pytest.fixture
+def app(monkeypatch):
+    AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+    monkeypatch.setenv('RGB_SESSION_STORE', 'memory')
+    at = AppTest.from_file(os.path.join(APP_DIR, 'streamlit_app.py'), default_timeout=60)
+    at.run()
+    return at
+
+
+def _question_heading(at):
+    return next(md.value for md in at.markdown if "class='question-box'" in md.value)
+
+
+def test_first_adaptive_question_is_numbered_q1(app):
+    app.checkbox(key='adaptive_mode').check().run()
+    app.button(key='start_i').click().run()
+    assert not app.exception
+    assert "<h2>Q1. " in _question_heading(app)
+
+    answer = next(b for b in app.button if b.key and b.key.startswith('q') and b.key.endswith('_val0'))
+    answer.click().run()
+    assert "<h2>Q2. " in _question_heading(app)
+
+
+def test_full_quiz_numbering_starts_at_q1(app):
+    app.button(key='start_i').click().run()
+    assert "<h2>Q1. " in _question_heading(app)
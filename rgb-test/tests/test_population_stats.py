@@ -0,0 +1,31 @@
+import json
+
+from population_stats import aggregate_file
+from question_bank import open_bank
+
+
+def test_malformed_records_are_skipped_and_counted(tmp_path):
+    question_ids = list(open_bank().question_ids)
+    first, second = str(question_ids[0]), str(question_ids[1])
+    lines = [
+        json.dumps({'responses': {first: 2, second: -1}}),
+        '{"responses": {',                                   # 깨진 JSON
+        json.dumps({'responses': {first: 300}}),             # int8 에 넣으면 넘치는 값
+        json.dumps({'responses': {first: 9}}),               # int8 에는 들어가지만 -4~4 밖
+        json.dumps({'responses': {first: -20}}),
+        json.dumps({'responses': {first: '3'}}),             # 문자열 점수
+        json.dumps({'id': 'no-responses'}),                  # 'responses' 없음
+        json.dumps({'responses': {'999999': 1}}),            # 모르는 문항 id
+        json.dumps([1, 2]),                                  # 객체가 아님
+        json.dumps({'responses': {first: 4, second: 1}}),
+    ]
+    path = tmp_path / 'archive.jsonl'
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    stats = aggregate_file(str(path), chunk_rows=2, log=None)
+    summary = stats.summary()
+
+    assert summary['sessions'] == 2
+    assert summary['rejected'] == 8
+    assert summary['questions'][int(first)] == {'answered': 2, 'mean': 3.0, 'variance': 1.0}
+    assert summary['questions'][int(second)] == {'answered': 2, 'mean': 0.0, 'variance': 1.0}